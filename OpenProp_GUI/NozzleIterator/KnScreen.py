@@ -0,0 +1,71 @@
+# KN SCREEN
+# Cheap pre-screen of nozzle throat diameters before full simulation. The burning surface area of the grains
+# against regression depth does not depend on the nozzle, so it is read from a burn profile of the motor, see
+# Motor.compileBurnProfile. Peak Kn and ideal peak chamber pressure then follow for every throat diameter at once,
+# and diameters that clearly break the pressure or port/throat limits are dropped before any simulation is run.
+
+import numpy as np
+
+from .motorlib import geometry
+from .motorlib.motor import BurnProfile
+
+# Number of regression depths the burning area is sampled at when the motor's simulations don't tabulate their
+# geometry, so the screen can't share their burn profile
+SCREEN_PROFILE_SAMPLES = 200
+
+# Fraction the ideal peak pressure must exceed maxPressure by before a throat is dropped. The simulation only sees
+# the burning area at its own timesteps so its peak can sit slightly under the peak of the sampled profile.
+PRESSURE_MARGIN = 0.05
+
+# Brief - Returns the burning surface area of the motor at every regression depth its burn profile is tabulated at
+# param motor - motor to profile, the grain maps made here are reused by later simulations of it. If it tabulates
+#               its geometry, its burn profile is compiled when it has none for its current grains and is kept
+# return - tuple of the regression depths and the burning surface area at each
+def getBurningArea(motor):
+    profile = motor.burnProfile
+    if profile is None or not profile.describes(motor):
+        if motor.config.getProperty("tabulateGeometry"):
+            profile = motor.compileBurnProfile()
+        else:
+            motor.prepareGrains()
+            profile = BurnProfile(motor, SCREEN_PROFILE_SAMPLES)
+    grains = profile.grains
+    twins = motor.getGrainTwins()
+
+    # Every grain regresses by the same depth until it burns out, see Motor.runSimulation
+    regression = np.unique(np.concatenate([grain.depths for grain in grains]))
+    burningArea = np.array([motor.calcBurningSurfaceArea([reg] * len(grains), twins, grains) for reg in regression])
+    return regression, burningArea
+
+# Brief - Drops the throat diameters that clearly break the motor's pressure or port/throat limits
+# param throat_vals - throat diameters to screen
+# param nozzleConfig - configuration dictionary of the nozzle
+# param motor - motor without a nozzle
+# return - tuple of the throat diameters that pass and a dictionary of throat diameter to the reason it was dropped
+def screenThroats(throat_vals, nozzleConfig, motor):
+    # A motor without grains has no burning area to screen against, its simulations report the missing grains
+    if not motor.grains:
+        return list(throat_vals), {}
+
+    throatArea = geometry.circleArea(np.asarray(throat_vals, dtype=float))
+    _, burningArea = getBurningArea(motor)
+
+    # An eroding throat lowers the pressure later in the burn, so only the pressure at ignition is a sure lower bound
+    # on the peak. Slag deposits only raise it, so the full profile is still safe then.
+    peakArea = burningArea[0] if nozzleConfig["ErosionCoef"] > 0 else burningArea.max()
+    pressure = np.vectorize(motor.propellant.getPressureFromKn)(peakArea / throatArea)
+
+    aftPortArea = motor.grains[-1].getPortArea(0) # None for end burners
+    ratio = None if aftPortArea is None else aftPortArea / throatArea
+    minPortThroat = motor.config.getProperty("minPortThroat")
+
+    passed = []
+    dropped = {}
+    for index, throat in enumerate(throat_vals):
+        if pressure[index] > nozzleConfig["maxPressure"] * (1 + PRESSURE_MARGIN):
+            dropped[throat] = f"ideal peak pressure {pressure[index]:.0f} Pa"
+        elif ratio is not None and minPortThroat is not None and ratio[index] < minPortThroat:
+            dropped[throat] = f"port/throat ratio {ratio[index]:.3f}"
+        else:
+            passed.append(throat)
+    return passed, dropped
@@ -11,16 +11,30 @@ from .motorlib.grains.finocyl import Finocyl
 from .motorlib.motor import Motor
 
 # Python libraries
+import copy
+import logging
 import math
 import time
+import threading
 
 # Custom Classes
 from .ConfigWrapper import ConfigWrapper
+from .SweepReducer import SweepReducer, preferenceScore
+from .ResultStore import ResultStore, configFingerprint, pointKey
+from .SweepBackend import makeBackend, SweepBackendError
+from .KnScreen import screenThroats
 
 # Multicore processing tools
-import concurrent.futures
 from itertools import product
 
+from scipy.stats import spearmanr
+
+logger = logging.getLogger(__name__)
+
+# Coarse stage defaults of a multi fidelity sweep, mapDim is the smallest openMotor allows
+COARSE_MAP_DIM = 250
+COARSE_TIMESTEP_FACTOR = 2
+DEFAULT_FINALISTS = 10
 
 # Used for multicore processesing black magic
 def frange(start, stop, step):
@@ -31,7 +45,14 @@ def frange(start, stop, step):
     return vals
 
 # Brief - Parses the config given to the nozzle files and runs the simluation flow
-def main(NIconfig):
+# param reducer - optional SweepReducer to collect the sweep into, keeps the top K results when given
+# param stopEvent - optional threading.Event, setting it cancels the sweep and returns the best so far
+# param onProgress - optional callback, called with the SweepJob each time a point finishes
+# param executor - optional process pool shared with other sweeps, it is used in place of a private pool
+# param backend - optional SweepBackend to run the points on, made from the config's 'backend' key if None
+# return - the best simulation, its nozzle and the nozzle config, which holds the 'fidelity_report' of a multi
+#          fidelity sweep, see MultiFidelitySweep
+def main(NIconfig, reducer=None, stopEvent=None, onProgress=None, executor=None, backend=None):
 
   motor = setupProp(NIconfig)
 
@@ -40,11 +61,58 @@ def main(NIconfig):
   max_threads = NIconfig['Nozzle']['iteration_threads']
   NIconfig['Nozzle']['maxPressure'] = NIconfig['Motor']['SimulationParameters']['maxPressure']
 
-  bestConfiguration = iteration(NIconfig["Nozzle"], motor, max_threads, parallel_mode)
+  # Completed points are persisted when a result store is configured so the sweep can be resumed
+  store = None
+  if NIconfig['Nozzle'].get('result_store'):
+    store = ResultStore(NIconfig['Nozzle']['result_store'], configFingerprint(NIconfig))
+
+  try:
+    if fidelitySettings(NIconfig['Nozzle']) is not None:
+      # The coarse stage has its own motor and store fingerprint as its results differ from full fidelity ones
+      coarse = coarseConfig(NIconfig)
+      coarseStore = None
+      if store is not None:
+        coarseStore = ResultStore(NIconfig['Nozzle']['result_store'], configFingerprint(coarse))
+      try:
+        job = MultiFidelitySweep(NIconfig["Nozzle"], motor, setupProp(coarse), max_threads, parallel_mode, reducer,
+                                 store, coarseStore, stopEvent, onProgress, executor, backend)
+        bestConfiguration = job.run()
+      finally:
+        if coarseStore is not None:
+          coarseStore.close()
+      NIconfig['Nozzle']['fidelity_report'] = job.report
+    else:
+      job = SweepJob(NIconfig["Nozzle"], motor, max_threads, parallel_mode, reducer, store, stopEvent, onProgress,
+                     executor, backend)
+      bestConfiguration = job.run()
+  finally:
+    if store is not None:
+      store.close()
 
   (simRes, nozzle) = bestConfiguration
   return simRes, nozzle, NIconfig['Nozzle']
 
+# Brief - Reads the 'multi_fidelity' nozzle key, true or a dictionary of settings runs a two stage sweep
+# param nozzleConfig - configuration dictionary of the nozzle
+# return - dictionary of the multi fidelity settings, empty to use all defaults, or None for a single stage sweep
+def fidelitySettings(nozzleConfig):
+  settings = nozzleConfig.get('multi_fidelity')
+  if settings is True:
+    return {}
+  if isinstance(settings, dict):
+    return settings
+  return None
+
+# Brief - Copies the config with the coarse simulation settings of its 'multi_fidelity' nozzle key
+# return - the coarse config, the original is left untouched
+def coarseConfig(NIconfig):
+  settings = fidelitySettings(NIconfig['Nozzle'])
+  coarse = copy.deepcopy(NIconfig)
+  behavior = coarse['Motor']['SimulationBehavior']
+  behavior['mapDim'] = settings.get('mapDim', COARSE_MAP_DIM)
+  behavior['timestep'] = settings.get('timestep', behavior['timestep'] * COARSE_TIMESTEP_FACTOR)
+  return coarse
+
 # Brief - Parse the configuration files
 # Parameters - config file 
 def setupProp(configFile):
@@ -88,95 +156,401 @@ def setupProp(configFile):
 
 # Breif - Performs the iterative solving of the nozzle
 # param nozzleConfig - configuration dictionary of the nozzle
+# param reducer - SweepReducer results are folded into as they arrive, one is made from the config if None
+# param store - optional ResultStore, stored points are reused and new points are saved as they finish
 # return - tuple with the best nozzle and motor sim respectively 
-def iteration(nozzleConfig, motor, max_threads=None, parallel_mode=True):
-    stepSize = nozzleConfig["iteration_step_size"]
-
-    # Create sweep grid
-    throat_vals = frange(nozzleConfig["minDia"], nozzleConfig["maxDia"], stepSize)
-    throatLength_vals = frange(nozzleConfig["minLen"], nozzleConfig["maxLen"], stepSize)
-    combinations = list(product(throat_vals, throatLength_vals))
-
-    start_time = time.perf_counter()
-
-    # Fallback container
-    results = []
-
-    # Decide whether to run parallel or not
-    if parallel_mode:
+def iteration(nozzleConfig, motor, max_threads=None, parallel_mode=True, reducer=None, store=None):
+    return SweepJob(nozzleConfig, motor, max_threads, parallel_mode, reducer, store).run()
+
+# A single nozzle sweep that can be cancelled from another thread and reports its progress as it runs
+class SweepJob:
+
+    # Number of points in flight on the backend at once
+    windowSize = 100
+
+    # Seconds between checks for cancellation while waiting on the backend
+    pollInterval = 0.2
+
+    # Brief - Constructor, see iteration for the parameters
+    # param stopEvent - optional threading.Event shared with the caller, setting it cancels the sweep
+    # param onProgress - optional callback, called with this job each time a point finishes
+    # param executor - optional process pool shared with other jobs, it is not shut down by this job
+    # param backend - optional SweepBackend shared with other jobs, one is made from the config and shut down after
+    #                 the sweep if None
+    # param combinations - optional list of (throat, throatLength) points to sweep in place of the config's grid,
+    #                      they are swept as given without the pre-screen or throat search
+    def __init__(self, nozzleConfig, motor, max_threads=None, parallel_mode=True, reducer=None, store=None,
+                 stopEvent=None, onProgress=None, executor=None, backend=None, combinations=None):
+        self.nozzleConfig = nozzleConfig
+        self.motor = motor
+        self.max_threads = max_threads
+        self.parallel_mode = parallel_mode
+        self.reducer = reducer if reducer is not None else makeReducer(nozzleConfig)
+        self.store = store
+        self.stopEvent = stopEvent if stopEvent is not None else threading.Event()
+        self.onProgress = onProgress
+        self.executor = executor
+        self.backend = backend
+
+        self._isGrid = combinations is None
+        if self._isGrid:
+            stepSize = nozzleConfig["iteration_step_size"]
+
+            # Create sweep grid
+            throat_vals = frange(nozzleConfig["minDia"], nozzleConfig["maxDia"], stepSize)
+            throatLength_vals = frange(nozzleConfig["minLen"], nozzleConfig["maxLen"], stepSize)
+            self.combinations = list(product(throat_vals, throatLength_vals))
+        else:
+            self.combinations = list(combinations)
+
+        self.total = len(self.combinations)
+        self.completed = 0
+        self.simulated = 0 # Points simulated by this job, excludes points loaded from the store
+        self.start_time = None
+
+        # Points finished in this sweep, used to resume after a failure of the process pool
+        self._done = set()
+
+        # Throat diameters dropped by the Kn pre-screen, mapped to the reason they were dropped
+        self.screened = {}
+
+    # Brief - Requests that the sweep stop, pending points are dropped and the best so far is returned
+    def cancel(self):
+        self.stopEvent.set()
+
+    def isCancelled(self):
+        return self.stopEvent.is_set()
+
+    # Brief - returns a dictionary with the completed and total point counts, elapsed time and estimated time
+    #         remaining in seconds (None until a point has been simulated), and the best (simRes, nozzle) so far
+    def getProgress(self):
+        elapsed = 0 if self.start_time is None else time.perf_counter() - self.start_time
+        eta = None
+        if self.simulated > 0:
+            eta = elapsed / self.simulated * (self.total - self.completed)
+        return {
+            "completed": self.completed,
+            "total": self.total,
+            "elapsed": elapsed,
+            "eta": eta,
+            "best": self.reducer.getBest(),
+            "cancelled": self.isCancelled(),
+        }
+
+    # Brief - Runs the sweep to completion or cancellation
+    # return - tuple with the best nozzle and motor sim respectively
+    def run(self):
+        self.start_time = time.perf_counter()
+
+        # Lean grains are sent to the workers already set up, so their maps are only made once here
+        if self.motor.config.getProperty("leanGrainMaps"):
+            self.motor.prepareGrains()
+
+        # The burn profile only depends on the grains, so it is tabulated once here and shared by every nozzle tried,
+        # including those simulated by workers, which get it with the motor
+        if self.motor.config.getProperty("tabulateGeometry"):
+            self.motor.compileBurnProfile()
+
+        if self._isGrid and self.nozzleConfig.get("prescreen"):
+            self._prescreen()
+        if self._isGrid and self.nozzleConfig.get("throat_search"):
+            self._narrowThroats()
+
+        # Reuse any points a previous sweep already stored
+        if self.store is not None:
+            stored = self.store.getCompleted()
+            for result in self.store.iterResults(pointKey(*point) for point in self.combinations):
+                self.reducer.add(*result)
+            self._done = {point for point in self.combinations if pointKey(*point) in stored}
+            self.completed = len(self._done)
+
+        # Decide whether to run parallel or not
+        if self.parallel_mode or self.executor is not None or self.backend is not None:
+            try:
+                self._runParallel(self._remaining())
+            except SweepBackendError:
+                # Pick up where the pool stopped rather than starting over
+                logger.warning("Sweep backend failed, simulating the remaining points in this process", exc_info=True)
+                run_simulations_sequentially(self._remaining(), self.nozzleConfig, self.motor, self._record,
+                                             self.stopEvent)
+        else:
+            run_simulations_sequentially(self._remaining(), self.nozzleConfig, self.motor, self._record,
+                                         self.stopEvent)
+
+        return self.reducer.getBest()
+
+    # Brief - Drops the throat diameters that the Kn pre-screen shows clearly break the pressure or port/throat limits
+    def _prescreen(self):
+        throat_vals = sorted({throat for throat, _ in self.combinations})
+        _, self.screened = screenThroats(throat_vals, self.nozzleConfig, self.motor)
+        self.combinations = [point for point in self.combinations if point[0] not in self.screened]
+        self.total = len(self.combinations)
+
+    # Brief - Narrows the sweep grid to the smallest throat diameters that keep the peak pressure within maxPressure.
+    #         Diameters with no throat length that gives an allowed convergence angle are dropped first. Peak pressure
+    #         falls as the throat grows, so the smallest admissible diameter is found by bisection and only the
+    #         'throat_search' diameters from it upward are swept, the over pressure ones never are.
+    def _narrowThroats(self):
+        # One nozzle that the sweep would simulate for each diameter, used to probe its peak pressure
+        probes = {}
+        for throat, throatLength in sorted(self.combinations):
+            if throat not in probes and allowedConvergenceAngle(throat, throatLength, self.nozzleConfig) is not None:
+                probes[throat] = throatLength
+        probes = list(probes.items())
+        first = findMinimumThroat(probes, self.nozzleConfig, self.motor, self.stopEvent)
+        admissible = {throat for throat, _ in probes[first:first + self.nozzleConfig["throat_search"]]}
+        self.combinations = [point for point in self.combinations if point[0] in admissible]
+        self.total = len(self.combinations)
+
+    def _remaining(self):
+        return [point for point in self.combinations if point not in self._done]
+
+    # Brief - Folds a finished point into the reducer and store and reports progress
+    def _record(self, point, result):
+        self._done.add(point)
+        self.completed += 1
+        self.simulated += 1
+        if self.store is not None:
+            self.store.save(*point, result)
+        if result is not None:
+            self.reducer.add(*result)
+        if self.onProgress is not None:
+            self.onProgress(self)
+
+    # Brief - Simulates the points on the backend, keeping a bounded window of points in flight. Results are
+    #         recorded the same way whichever backend produced them.
+    def _runParallel(self, points):
+        points = iter(points)
+        backend = self.backend
+        if backend is None:
+            backend = makeBackend(self.nozzleConfig, self.max_threads, self.executor)
+        session = backend.open(self.nozzleConfig, self.motor)
+        inFlight = set()
         try:
-            batch_size = 100
-            with concurrent.futures.ProcessPoolExecutor(max_workers=max_threads) as executor:
-                for i in range(0, len(combinations), batch_size):
-                    batch = combinations[i:i+batch_size]
-                    futures = [
-                        executor.submit(simulate_point, throat, throatLen, nozzleConfig, motor)
-                        for throat, throatLen in batch
-                    ]
-                    for future in concurrent.futures.as_completed(futures):
-                        result = future.result()
-                        if result is not None:
-                            results.append(result)
-        except Exception as e:
-            results = run_simulations_sequentially(combinations, nozzleConfig, motor)
-    else:
-        results = run_simulations_sequentially(combinations, nozzleConfig, motor)
-
-    # Select best
-    bestSim, bestNozzle = None, None
-    for simRes, nozzle in results:
-        if bestSim is None or isPriority(nozzleConfig["preference"], simRes, bestSim, nozzle, bestNozzle):
-            bestSim = simRes
-            bestNozzle = nozzle
+            def fill():
+                while len(inFlight) < self.windowSize:
+                    point = next(points, None)
+                    if point is None:
+                        return
+                    session.submit(point)
+                    inFlight.add(point)
+
+            fill()
+            while inFlight and not self.isCancelled():
+                for point, result in session.collect(self.pollInterval):
+                    # A point handed out twice by the backend is only counted once
+                    if point in inFlight:
+                        inFlight.discard(point)
+                        self._record(point, result)
+                fill()
+        finally:
+            session.close(self.isCancelled())
+            if backend is not self.backend:
+                backend.shutdown(self.isCancelled())
+
+# A two stage sweep. Every point is first simulated with a coarse mapDim and timestep, then the top finalists by the
+# configured preference are simulated again at full fidelity and the winner is picked from those. Has the same
+# cancel, isCancelled and getProgress interface as SweepJob, progress is reported by the stage that is running.
+class MultiFidelitySweep:
+
+    # Brief - Constructor, see SweepJob for the shared parameters
+    # param motor - motor with the full fidelity simulation settings
+    # param coarseMotor - motor with the coarse simulation settings, see coarseConfig
+    # param reducer - SweepReducer the full fidelity results of the finalists are folded into
+    # param store - optional ResultStore for the full fidelity stage
+    # param coarseStore - optional ResultStore for the coarse stage, fingerprinted with the coarse settings
+    def __init__(self, nozzleConfig, motor, coarseMotor, max_threads=None, parallel_mode=True, reducer=None,
+                 store=None, coarseStore=None, stopEvent=None, onProgress=None, executor=None, backend=None):
+        self.nozzleConfig = nozzleConfig
+        self.motor = motor
+        self.max_threads = max_threads
+        self.parallel_mode = parallel_mode
+        self.reducer = reducer if reducer is not None else makeReducer(nozzleConfig)
+        self.store = store
+        self.stopEvent = stopEvent if stopEvent is not None else threading.Event()
+        self.onProgress = onProgress
+        self.executor = executor
+        self.backend = backend
+        self.finalists = fidelitySettings(nozzleConfig).get("finalists", DEFAULT_FINALISTS)
+
+        self.coarse = SweepJob(nozzleConfig, coarseMotor, max_threads, parallel_mode,
+                               SweepReducer(nozzleConfig["preference"], self.finalists), coarseStore,
+                               self.stopEvent, onProgress, executor, backend)
+        self.fine = None
+
+        # Comparison of the two stages, set once the full fidelity stage finishes
+        self.report = None
+
+    def cancel(self):
+        self.stopEvent.set()
+
+    def isCancelled(self):
+        return self.stopEvent.is_set()
+
+    def getProgress(self):
+        return (self.fine or self.coarse).getProgress()
+
+    # Brief - Runs both stages, a cancelled coarse stage returns its best coarse result
+    # return - tuple with the best nozzle and motor sim respectively
+    def run(self):
+        # Both stages share one backend so remote workers stay connected between them
+        backend = self.backend
+        if backend is None and (self.parallel_mode or self.executor is not None):
+            backend = makeBackend(self.nozzleConfig, self.max_threads, self.executor)
+        self.coarse.backend = backend
+        try:
+            self.coarse.run()
+            if self.isCancelled():
+                return self.coarse.reducer.getBest()
+
+            ranked = self.coarse.reducer.getTopK()
+            points = [(nozzle["throat"], nozzle["throatLength"]) for _, _, nozzle in ranked]
+            self.fine = SweepJob(self.nozzleConfig, self.motor, self.max_threads, self.parallel_mode,
+                                 SweepReducer(self.nozzleConfig["preference"], len(points)), self.store,
+                                 self.stopEvent, self.onProgress, self.executor, backend, points)
+            self.fine.run()
+        finally:
+            if backend is not None and backend is not self.backend:
+                backend.shutdown(self.isCancelled())
+
+        for _, simRes, nozzle in self.fine.reducer.getTopK():
+            self.reducer.add(simRes, nozzle)
+        self.report = compareStages(ranked, self.fine.reducer.getTopK())
+        return self.reducer.getBest()
+
+# Brief - Compares the finalist rankings of the coarse and full fidelity stages of a multi fidelity sweep
+# param coarse - coarse (score, simRes, nozzle) of the finalists, best first
+# param fine - full fidelity (score, simRes, nozzle) of the finalists that stayed feasible, best first
+# return - dictionary with the number of finalists and of those feasible at full fidelity, the spearman rank
+#          correlation of the scores of both stages (None when it is undefined), whether the winner changed and the
+#          (throat, throatLength, coarse rank, full fidelity rank) of each finalist, ranks start at 1
+def compareStages(coarse, fine):
+    def point(nozzle):
+        return nozzle["throat"], nozzle["throatLength"]
+
+    coarseScores = {point(nozzle): score for score, _, nozzle in coarse}
+    fineScores = {point(nozzle): score for score, _, nozzle in fine}
+    fineRanks = {point(nozzle): rank for rank, (_, _, nozzle) in enumerate(fine, 1)}
+
+    # Correlation over the finalists feasible in both stages, tied scores share their average rank
+    shared = [p for p in coarseScores if p in fineScores]
+    coarseShared = [coarseScores[p] for p in shared]
+    fineShared = [fineScores[p] for p in shared]
+    correlation = None
+    if len(set(coarseShared)) > 1 and len(set(fineShared)) > 1:
+        correlation = float(spearmanr(coarseShared, fineShared)[0])
+
+    coarseWinner = point(coarse[0][2]) if coarse else None
+    winner = point(fine[0][2]) if fine else None
+    return {
+        "finalists": len(coarse),
+        "feasible": len(fine),
+        "rankCorrelation": correlation,
+        "coarseWinner": coarseWinner,
+        "winner": winner,
+        # The coarse pick would not have been the best at full fidelity
+        "winnerChanged": bool(fine) and bool(fineScores.get(coarseWinner) != fine[0][0]),
+        "ranks": [(*p, rank, fineRanks.get(p)) for rank, p in enumerate(coarseScores, 1)],
+    }
 
-    elapsed_time = time.perf_counter() - start_time
-    return bestSim, bestNozzle
+# Brief - Creates the sweep reducer described by the nozzle config
+# param nozzleConfig - configuration dictionary of the nozzle, optional keys 'top_k' and 'pareto_objectives'
+def makeReducer(nozzleConfig):
+    return SweepReducer(nozzleConfig["preference"], nozzleConfig.get("top_k", 0),
+                        nozzleConfig.get("pareto_objectives"))
 
-def run_simulations_sequentially(combinations, nozzleConfig, motor):
-    results = []
+# Brief - Simulates each point in turn on this process
+# param record - called with ((throat, throatLength), result) as each point finishes, result may be None
+# param stopEvent - optional threading.Event, the remaining points are skipped once it is set
+def run_simulations_sequentially(combinations, nozzleConfig, motor, record, stopEvent=None):
     for throat, throatLen in combinations:
-        result = simulate_point(throat, throatLen, nozzleConfig, motor)
-        if result is not None:
-            results.append(result)
-    return results
+        if stopEvent is not None and stopEvent.is_set():
+            return
+        record((throat, throatLen), simulate_point(throat, throatLen, nozzleConfig, motor))
+
+# Brief - Finds the smallest throat diameter whose peak pressure is within the nozzle config's maxPressure
+# param probes - (throat, throatLength) nozzles to search, in increasing order of throat diameter
+# param stopEvent - optional threading.Event, the search stops early once it is set
+# return - index of the smallest admissible diameter in probes, len(probes) if none are admissible
+def findMinimumThroat(probes, nozzleConfig, motor, stopEvent=None):
+    # Every diameter below low is over pressure, every diameter from high up is within it
+    low, high = 0, len(probes)
+    while low < high:
+        if stopEvent is not None and stopEvent.is_set():
+            return high
+        mid = (low + high) // 2
+        if peakPressure(*probes[mid], nozzleConfig, motor) <= nozzleConfig["maxPressure"]:
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+# Brief - Simulates the motor with the nozzle the sweep would use for the given throat and returns the peak chamber
+#         pressure
+# param throatLength - a throat length that gives the throat an allowed convergence angle
+# return - the peak pressure, infinite if the simulation failed
+def peakPressure(throat, throatLength, nozzleConfig, motor_serialized):
+    nozzle = nozzleProperties(throat, throatLength, nozzleConfig)
+    if nozzle is None:
+        return math.inf
+
+    simRes = motor_serialized.clone(makeNozzle(nozzle)).runSimulation()
+    if not simRes.success:
+        return math.inf
+    return simRes.getMaxPressure()
+
+# Brief - Returns the convergence half angle of a nozzle with the given throat, None if it is outside of the
+#         config's [minHalfConv, maxHalfConv] window
+def allowedConvergenceAngle(throat, throatLength, nozzleConfig):
+    convAngle = calcConvergenceHalfAngle(
+        nozzleConfig["nozzleDia"],
+        nozzleConfig["nozzleLength"],
+        throat,
+        throatLength,
+        nozzleConfig["exitHalf"],
+        nozzleConfig["exitDia"]
+    )
 
-def simulate_point(throat, throatLength, nozzleConfig, motor_serialized):
-    import copy
-    from .motorlib.nozzle import Nozzle
+    if not (nozzleConfig["minHalfConv"] <= convAngle <= nozzleConfig["maxHalfConv"]):
+        return None
+    return convAngle
 
-    motor = copy.deepcopy(motor_serialized)
+# Brief - Returns the properties of the nozzle that the sweep simulates for a point, None if its convergence angle
+#         is not allowed
+def nozzleProperties(throat, throatLength, nozzleConfig):
+    convAngle = allowedConvergenceAngle(throat, throatLength, nozzleConfig)
+    if convAngle is None:
+        return None
 
-    nozzle = {
+    return {
         "throat": throat,
         "throatLength": throatLength,
         "divAngle": nozzleConfig["exitHalf"],
+        "convAngle": convAngle,
         "efficiency": nozzleConfig["Efficiency"],
         "slagCoeff": nozzleConfig["SlagCoef"],
         "erosionCoeff": nozzleConfig["ErosionCoef"],
         "exit": nozzleConfig['exitDia'],
     }
 
-    convAngle = calcConvergenceHalfAngle(
-        nozzleConfig["nozzleDia"],
-        nozzleConfig["nozzleLength"],
-        throat,
-        throatLength,
-        nozzle["divAngle"],
-        nozzle["exit"]
-    )
-
-    if not (nozzleConfig["minHalfConv"] <= convAngle <= nozzleConfig["maxHalfConv"]):
-        return None
-
-    nozzle["convAngle"] = convAngle
+# Brief - Builds a motorlib Nozzle
+# param nozzle - dictionary of nozzle properties from nozzleProperties
+def makeNozzle(nozzle):
+    from .motorlib.nozzle import Nozzle
 
     currNozz = Nozzle()
     for key, value in nozzle.items():
         if key in currNozz.props:
             currNozz.props[key].setValue(value)
+    return currNozz
+
+def simulate_point(throat, throatLength, nozzleConfig, motor_serialized):
+    nozzle = nozzleProperties(throat, throatLength, nozzleConfig)
+    if nozzle is None:
+        return None
 
-    motor.nozzle = currNozz
-    simRes = motor.runSimulation()
+    # The grains are shared with every other point, only the nozzle is new
+    simRes = motor_serialized.clone(makeNozzle(nozzle)).runSimulation()
 
     if simRes.success:
         if simRes.getMaxPressure() <= nozzleConfig["maxPressure"]:
@@ -214,10 +588,4 @@ def calcConvergenceHalfAngle(dia, len, throatDia, throatLen, exitHalf, exitDia):
 # param simRes - similuation to compare to 
 # param bestSim - current best simulation
 def isPriority(priority, simRes, bestSim, nozzle=None, bestNozzle=None):
-    throat_penalty_factor = 0.1  # Adjust as needed
-    min_safe_throat_length = 0.012
-    score = getattr(simRes, f"get{priority}")()
-    if nozzle and nozzle["throatLength"] < min_safe_throat_length:
-        score *= (1 - throat_penalty_factor)
-    best_score = getattr(bestSim, f"get{priority}")()
-    return score > best_score
+    return preferenceScore(priority, simRes, nozzle) > preferenceScore(priority, bestSim, bestNozzle)
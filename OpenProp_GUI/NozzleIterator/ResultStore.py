@@ -0,0 +1,74 @@
+# RESULT STORE
+# Local SQLite store for nozzle sweep results. Every finished sweep point is written as soon as it completes,
+# keyed by a fingerprint of the motor, propellant and nozzle settings plus the (throat, throatLength) of the
+# point, so an interrupted or overlapping sweep can skip points that were already simulated.
+
+import hashlib
+import json
+import pickle
+import sqlite3
+
+# Nozzle config keys that change the outcome of a single sweep point. Grid bounds, step size, threading and
+# selection settings are left out so that overlapping sweeps share results.
+FINGERPRINT_NOZZLE_KEYS = ["exitHalf", "exitDia", "SlagCoef", "ErosionCoef", "Efficiency", "nozzleDia",
+                           "nozzleLength", "minHalfConv", "maxHalfConv", "maxPressure"]
+
+# Brief - Creates a fingerprint of everything that affects the result of a sweep point
+# param NIconfig - full nozzle iterator config with 'Propellant', 'Grains', 'Motor' and 'Nozzle' sections
+# return - hex digest identifying the configuration
+def configFingerprint(NIconfig):
+    relevant = {
+        "Propellant": NIconfig["Propellant"],
+        "Grains": NIconfig["Grains"],
+        "Motor": NIconfig["Motor"],
+        "Nozzle": {key: NIconfig["Nozzle"].get(key) for key in FINGERPRINT_NOZZLE_KEYS},
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+# Brief - Rounds a sweep coordinate the same way frange does so lookups match between runs
+def pointKey(throat, throatLength):
+    return round(throat, 8), round(throatLength, 8)
+
+class ResultStore:
+
+    # Brief - Constructor, opens or creates the database
+    # param path - file path of the SQLite database
+    # param fingerprint - configuration fingerprint from configFingerprint
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                           "fingerprint TEXT NOT NULL, "
+                           "throat REAL NOT NULL, "
+                           "throatLength REAL NOT NULL, "
+                           "result BLOB, "
+                           "PRIMARY KEY (fingerprint, throat, throatLength))")
+        self._conn.commit()
+
+    # Brief - returns the set of (throat, throatLength) points already stored for this fingerprint
+    def getCompleted(self):
+        rows = self._conn.execute("SELECT throat, throatLength FROM results WHERE fingerprint = ?",
+                                  (self.fingerprint,))
+        return {pointKey(throat, throatLength) for throat, throatLength in rows}
+
+    # Brief - Yields the stored feasible (simRes, nozzle) results within the given points one at a time
+    # param points - collection of (throat, throatLength) to load, only these are returned
+    def iterResults(self, points):
+        points = {pointKey(*point) for point in points}
+        rows = self._conn.execute("SELECT throat, throatLength, result FROM results "
+                                  "WHERE fingerprint = ? AND result IS NOT NULL", (self.fingerprint,))
+        for throat, throatLength, blob in rows:
+            if pointKey(throat, throatLength) in points:
+                yield pickle.loads(blob)
+
+    # Brief - Saves the outcome of a sweep point, a result of None marks the point as infeasible
+    def save(self, throat, throatLength, result):
+        throat, throatLength = pointKey(throat, throatLength)
+        blob = None if result is None else pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                           (self.fingerprint, throat, throatLength, blob))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
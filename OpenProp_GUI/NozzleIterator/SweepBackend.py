@@ -0,0 +1,344 @@
+# SWEEP BACKEND
+# Pluggable execution backends for nozzle sweeps. A backend hands out sessions, one per sweep, that accept
+# (throat, throatLength) points and return (point, result) pairs as they finish, where result is the return of
+# NozzleIterator.simulate_point. The sweep keeps doing all of the selection work on the results it collects.
+#
+# LocalPoolBackend runs points on a local process pool and is the default. QueueBackend serves a task queue
+# over the network with multiprocessing.managers so that worker processes on this or other machines can pull
+# points and push results back. Workers are started with:
+#   python -m NozzleIterator.SweepBackend HOST:PORT --authkey KEY --processes 4
+#
+# A point that fails on a worker comes back with the traceback of its failure and the session raises a RuntimeError
+# for it. A session raises SweepBackendError when the backend itself fails, like a broken process pool or a motor
+# that can't be sent to the workers.
+
+import argparse
+import concurrent.futures
+import itertools
+import multiprocessing
+import pickle
+import queue
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.managers import BaseManager, DictProxy
+
+# Raised by backends and their sessions when the backend fails rather than a point it runs, a sweep can still
+# simulate its points without the backend
+class SweepBackendError(Exception):
+    pass
+
+# Brief - Creates the backend described by the nozzle config
+# param nozzleConfig - configuration dictionary of the nozzle, the optional 'backend' key is either "local" or a
+#                      dictionary like {"type": "queue", "address": "0.0.0.0:50000", "authkey": "secret",
+#                      "local_workers": 0, "task_timeout": null}
+# param max_threads - number of local worker processes for the local backend
+# param executor - optional process pool shared with other sweeps for the local backend
+def makeBackend(nozzleConfig, max_threads=None, executor=None):
+    settings = nozzleConfig.get("backend") or "local"
+    if settings == "local" or (isinstance(settings, dict) and settings.get("type", "local") == "local"):
+        return LocalPoolBackend(max_threads, executor)
+    if isinstance(settings, dict) and settings.get("type") == "queue":
+        return QueueBackend(settings["address"], settings["authkey"], settings.get("local_workers", 0),
+                            settings.get("task_timeout"))
+    raise ValueError("Unknown sweep backend " + str(settings))
+
+# Brief - Splits a "host:port" string into a manager address tuple
+def parseAddress(address):
+    if isinstance(address, (tuple, list)):
+        return address[0], int(address[1])
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+class SweepBackend:
+
+    # Brief - Starts a sweep on the backend
+    # param nozzleConfig - configuration dictionary of the nozzle
+    # param motor - motor without a nozzle, shared by every point
+    # return - a session with submit(point), collect(timeout) and close(cancelled)
+    def open(self, nozzleConfig, motor):
+        raise NotImplementedError
+
+    # Brief - Releases everything the backend holds, sessions must be closed first
+    # param cancelled - True if the sweep was cancelled and running work does not need to be waited on
+    def shutdown(self, cancelled=False):
+        pass
+
+class LocalPoolBackend(SweepBackend):
+
+    # Brief - Constructor
+    # param max_workers - number of worker processes when the backend creates its own pool
+    # param executor - optional process pool shared with other sweeps, it is never shut down by the backend
+    def __init__(self, max_workers=None, executor=None):
+        self.max_workers = max_workers
+        self.executor = executor
+        self._ownsExecutor = executor is None
+
+    def open(self, nozzleConfig, motor):
+        # A point the pool can't pickle breaks its feeder thread and leaves shutdown waiting on it forever, so the
+        # context every point is sent with is checked once here instead
+        try:
+            pickle.dumps((nozzleConfig, motor))
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            raise SweepBackendError(f"The motor can't be sent to the process pool: {error}") from error
+        if self.executor is None:
+            try:
+                self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as error:
+                raise SweepBackendError(f"Could not start a process pool: {error}") from error
+        return _LocalPoolSession(self.executor, nozzleConfig, motor)
+
+    def shutdown(self, cancelled=False):
+        if self._ownsExecutor and self.executor is not None:
+            # On cancel, queued points are dropped and the workers are not waited on
+            self.executor.shutdown(wait=not cancelled, cancel_futures=True)
+            self.executor = None
+
+class _LocalPoolSession:
+
+    def __init__(self, executor, nozzleConfig, motor):
+        self.executor = executor
+        self.nozzleConfig = nozzleConfig
+        self.motor = motor
+        self._pending = {}
+
+    def submit(self, point):
+        try:
+            future = self.executor.submit(runPoint, point, self.nozzleConfig, self.motor)
+        except concurrent.futures.BrokenExecutor as error:
+            raise SweepBackendError(f"The process pool is broken: {error}") from error
+        self._pending[future] = point
+
+    # Brief - Waits up to timeout seconds for points to finish
+    # return - list of (point, result), raises if a point failed
+    def collect(self, timeout):
+        if not self._pending:
+            return []
+        finished, _ = concurrent.futures.wait(self._pending, timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+        out = []
+        for future in finished:
+            point = self._pending.pop(future)
+            # runPoint catches the failures of the point itself, anything raised here is from sending the point to
+            # the pool or getting its result back, like a worker that died or a motor that can't be pickled
+            error = future.exception()
+            if error is not None:
+                raise SweepBackendError(f"Sweep point {point} could not be run on the process pool: {error!r}") \
+                    from error
+            result, failure = future.result()
+            if failure is not None:
+                raise RuntimeError(f"Sweep point {point} failed on a worker:\n{failure}")
+            out.append((point, result))
+        return out
+
+    def close(self, cancelled=False):
+        for future in self._pending:
+            future.cancel()
+        self._pending = {}
+
+class _QueueManager(BaseManager):
+    pass
+
+class QueueBackend(SweepBackend):
+
+    # Brief - Constructor, the server is started on the first open
+    # param address - "host:port" to listen on, port 0 picks a free port
+    # param authkey - shared secret workers must present, string or bytes
+    # param localWorkers - number of worker processes to start on this machine
+    # param taskTimeout - seconds after which a point that has not come back is handed out again, None waits
+    #                     forever, use it when remote workers may die mid point
+    def __init__(self, address, authkey, localWorkers=0, taskTimeout=None):
+        self.address = parseAddress(address)
+        self.authkey = authkey.encode() if isinstance(authkey, str) else authkey
+        self.localWorkers = localWorkers
+        self.taskTimeout = taskTimeout
+
+        self._lock = threading.Lock()
+        self._server = None
+        self._stopping = threading.Event()
+        self._workers = []
+        self._jobIds = itertools.count()
+
+        # Shared with workers through the manager server
+        self._tasks = queue.Queue()
+        self._contexts = {}
+        self._resultQueues = {}
+
+    # Brief - returns the (host, port) the server listens on, usable by workers on this machine
+    def getAddress(self):
+        host, port = self._server.address
+        if host in ("", "0.0.0.0"):
+            host = "127.0.0.1"
+        return host, port
+
+    def _start(self):
+        with self._lock:
+            if self._server is not None:
+                return
+            # A subclass per backend keeps the registered callables of several backends apart
+            manager = type("_QueueServerManager", (_QueueManager,), {})
+            manager.register("get_tasks", callable=lambda: self._tasks)
+            manager.register("get_contexts", callable=lambda: self._contexts, proxytype=DictProxy)
+            manager.register("get_result_queue", callable=lambda jobId: self._resultQueues[jobId])
+            self._server = manager(address=self.address, authkey=self.authkey).get_server()
+            self._server.stop_event = threading.Event()
+            self._stopping.clear()
+            threading.Thread(target=self._serve, args=(self._server,), daemon=True).start()
+
+            for _ in range(self.localWorkers):
+                worker = multiprocessing.Process(target=runWorker, args=(self.getAddress(), self.authkey), daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    # Brief - Accepts worker connections until shutdown. Used in place of Server.serve_forever, which cannot be
+    #         stopped without exiting the process and keeps the port bound.
+    def _serve(self, server):
+        while not self._stopping.is_set():
+            try:
+                connection = server.listener.accept()
+            except OSError:
+                continue
+            threading.Thread(target=server.handle_request, args=(connection,), daemon=True).start()
+
+    def open(self, nozzleConfig, motor):
+        try:
+            self._start()
+        except OSError as error:
+            raise SweepBackendError(f"Could not serve the sweep queue on {self.address}: {error}") from error
+        jobId = next(self._jobIds)
+        self._resultQueues[jobId] = queue.Queue()
+        self._contexts[jobId] = (nozzleConfig, motor)
+        return _QueueSession(self, jobId)
+
+    def _closeJob(self, jobId):
+        # Tasks of a closed job left in the queue are skipped by the workers
+        self._contexts.pop(jobId, None)
+        self._resultQueues.pop(jobId, None)
+
+    def shutdown(self, cancelled=False):
+        with self._lock:
+            if self._server is None:
+                return
+            self._stopping.set()
+            self._server.stop_event.set()
+            self._server.listener.close()
+            self._server = None
+            for worker in self._workers:
+                worker.terminate()
+            self._workers = []
+
+class _QueueSession:
+
+    def __init__(self, backend, jobId):
+        self.backend = backend
+        self.jobId = jobId
+        self._results = backend._resultQueues[jobId]
+        self._submitted = {} # point -> time it was last handed out
+
+    def submit(self, point):
+        self._submitted[point] = time.monotonic()
+        self.backend._tasks.put((self.jobId, point))
+
+    # Brief - Waits up to timeout seconds for points to come back from the workers
+    # return - list of (point, result), raises if a point failed on a worker
+    def collect(self, timeout):
+        out = []
+        try:
+            out.append(self._results.get(timeout=timeout))
+            while True:
+                out.append(self._results.get_nowait())
+        except queue.Empty:
+            pass
+
+        finished = []
+        for point, result, error in out:
+            if error is not None:
+                raise RuntimeError(f"Sweep point {point} failed on a worker:\n{error}")
+            if self._submitted.pop(point, None) is not None:
+                finished.append((point, result))
+
+        # Hand out points again that a worker took but never returned
+        if self.backend.taskTimeout is not None:
+            now = time.monotonic()
+            for point, submitted in list(self._submitted.items()):
+                if now - submitted > self.backend.taskTimeout:
+                    self.submit(point)
+
+        return finished
+
+    def close(self, cancelled=False):
+        self.backend._closeJob(self.jobId)
+
+# Brief - Simulates a point on a worker, catching its failure so that it reaches the sweep as the failure of the point
+#         rather than of the backend
+# param point - (throat, throatLength) to simulate
+# param nozzleConfig - configuration dictionary of the nozzle
+# param motor - motor without a nozzle
+# return - tuple of the return of NozzleIterator.simulate_point and None, or None and the traceback of the failure
+def runPoint(point, nozzleConfig, motor):
+    from .NozzleIterator import simulate_point
+    try:
+        return simulate_point(*point, nozzleConfig, motor), None
+    except Exception:
+        return None, traceback.format_exc()
+
+# Brief - Worker loop, pulls points from a QueueBackend and pushes results back until the server goes away
+# param address - (host, port) or "host:port" of the server
+# param authkey - shared secret of the server
+def runWorker(address, authkey):
+    _QueueManager.register("get_tasks")
+    _QueueManager.register("get_contexts", proxytype=DictProxy)
+    _QueueManager.register("get_result_queue")
+    authkey = authkey.encode() if isinstance(authkey, str) else authkey
+    manager = _QueueManager(address=parseAddress(address), authkey=authkey)
+    manager.connect()
+
+    tasks = manager.get_tasks()
+    contexts = manager.get_contexts()
+    cachedJob, context, results = None, None, None
+
+    try:
+        while True:
+            try:
+                jobId, point = tasks.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if jobId not in contexts:
+                continue # job was closed
+
+            # The motor and nozzle settings only cross the network once per job
+            if jobId != cachedJob:
+                context = contexts.get(jobId)
+                if context is None:
+                    continue
+                try:
+                    results = manager.get_result_queue(jobId)
+                except KeyError:
+                    continue
+                cachedJob = jobId
+
+            nozzleConfig, motor = context
+            results.put((point, *runPoint(point, nozzleConfig, motor)))
+    except (EOFError, ConnectionError):
+        return # server shut down
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Run nozzle sweep workers that pull points from a queue server.")
+    parser.add_argument("address", help="host:port of the sweep's queue backend")
+    parser.add_argument("--authkey", required=True, help="shared secret of the queue backend")
+    parser.add_argument("-p", "--processes", type=int, default=1, help="number of worker processes to run")
+    args = parser.parse_args(argv)
+
+    workers = [multiprocessing.Process(target=runWorker, args=(args.address, args.authkey))
+               for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(cli())
@@ -0,0 +1,137 @@
+# SWEEP REDUCER
+# Online reduction of nozzle sweep results. Results are folded in one at a time as the sweep produces
+# them, only the current best, an optional bounded top-K list and an optional pareto front are retained,
+# so memory use does not grow with the size of the sweep grid.
+
+import heapq
+from itertools import count
+
+# Throat length penalty applied to short throats, see preferenceScore
+THROAT_PENALTY_FACTOR = 0.1
+MIN_SAFE_THROAT_LENGTH = 0.012
+
+# Brief - Scores a simulation by the configured preference, penalizing throats that are too short
+# param priority - criteria to base preference on, used as get{priority} on the simulation result
+# param simRes - simulation result to score
+# param nozzle - nozzle dictionary used for the simulation, optional
+# return - the score, larger is better
+def preferenceScore(priority, simRes, nozzle=None):
+    score = getattr(simRes, f"get{priority}")()
+    if nozzle and nozzle["throatLength"] < MIN_SAFE_THROAT_LENGTH:
+        score *= (1 - THROAT_PENALTY_FACTOR)
+    return score
+
+# Brief - Returns the key results are ranked by, their score with equal scores going to the smaller throat diameter
+#         and then the shorter throat, so the ranking does not depend on the order results arrive in
+# param score - score of the result from preferenceScore
+# param nozzle - nozzle dictionary used for the simulation
+def rankKey(score, nozzle):
+    return score, -nozzle["throat"], -nozzle["throatLength"]
+
+class ParetoFront:
+
+    # Brief - Constructor
+    # param objectives - dictionary of objective name to 'max' or 'min', each name is used as get{name} on
+    #                    the simulation result, ex. {"ISP": "max", "MaxPressure": "min", "Impulse": "max"}
+    def __init__(self, objectives):
+        for direction in objectives.values():
+            if direction not in ('max', 'min'):
+                raise ValueError('Pareto objective direction must be "max" or "min", got ' + str(direction))
+        self.objectives = dict(objectives)
+        # List of (objective values, simRes, nozzle) that no other result seen so far dominates
+        self._front = []
+
+    # Brief - Evaluates the objectives of a simulation, negating minimized objectives so larger is better
+    def _key(self, simRes):
+        return tuple(getattr(simRes, f"get{name}")() * (1 if direction == 'max' else -1)
+                     for name, direction in self.objectives.items())
+
+    # Brief - returns True if objective values a are at least as good as b everywhere and better somewhere
+    @staticmethod
+    def dominates(a, b):
+        return all(x >= y for x, y in zip(a, b)) and any(x > y for x, y in zip(a, b))
+
+    # Brief - Adds a result to the front if it is not dominated, dropping any members it dominates
+    # return - True if the result joined the front
+    def add(self, simRes, nozzle):
+        key = self._key(simRes)
+        for other, _, _ in self._front:
+            if other == key or self.dominates(other, key):
+                return False
+        self._front = [entry for entry in self._front if not self.dominates(key, entry[0])]
+        self._front.append((key, simRes, nozzle))
+        return True
+
+    # Brief - returns the front as a list of (objective values, simRes, nozzle) sorted by the first objective,
+    #         objective values are in their natural sign and keyed by objective name
+    def getFront(self):
+        front = []
+        for key, simRes, nozzle in sorted(self._front, key=lambda entry: entry[0], reverse=True):
+            values = {name: value * (1 if direction == 'max' else -1)
+                      for (name, direction), value in zip(self.objectives.items(), key)}
+            front.append((values, simRes, nozzle))
+        return front
+
+    def __len__(self):
+        return len(self._front)
+
+class SweepReducer:
+
+    # Brief - Constructor
+    # param preference - criteria to base preference on, see preferenceScore
+    # param topK - number of best results to keep, 0 keeps only the best
+    # param objectives - optional pareto objectives, see ParetoFront, no front is kept when empty
+    def __init__(self, preference, topK=0, objectives=None):
+        self.preference = preference
+        self.topK = topK
+        self.objectives = objectives
+        self.front = ParetoFront(objectives) if objectives else None
+
+        self.bestSim = None
+        self.bestNozzle = None
+        self.bestScore = None
+        self.bestKey = None
+        self.count = 0
+
+        # Min heap of (rankKey, tiebreak, score, simRes, nozzle), the worst kept result sits at the top
+        self._heap = []
+        self._tiebreak = count()
+
+    # Brief - Folds a single sweep result into the reduction and discards it if it is not kept
+    # param simRes - simulation result of the sweep point
+    # param nozzle - nozzle dictionary of the sweep point
+    def add(self, simRes, nozzle):
+        self.count += 1
+        score = preferenceScore(self.preference, simRes, nozzle)
+        key = rankKey(score, nozzle)
+
+        if self.bestKey is None or key > self.bestKey:
+            self.bestSim = simRes
+            self.bestNozzle = nozzle
+            self.bestScore = score
+            self.bestKey = key
+
+        if self.topK > 0:
+            entry = (key, next(self._tiebreak), score, simRes, nozzle)
+            if len(self._heap) < self.topK:
+                heapq.heappush(self._heap, entry)
+            elif key > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+        if self.front is not None:
+            self.front.add(simRes, nozzle)
+
+    # Brief - returns the best result seen so far as a (simRes, nozzle) tuple
+    def getBest(self):
+        return self.bestSim, self.bestNozzle
+
+    # Brief - returns the kept results as a list of (score, simRes, nozzle), best first
+    def getTopK(self):
+        ranked = sorted(self._heap, key=lambda entry: entry[0], reverse=True)
+        return [(score, simRes, nozzle) for _, _, score, simRes, nozzle in ranked]
+
+    # Brief - returns the pareto front as described in ParetoFront.getFront, empty if no objectives are set
+    def getFront(self):
+        if self.front is None:
+            return []
+        return self.front.getFront()
@@ -0,0 +1,156 @@
+# BATCH RUNNER
+# Headless command line runner for the nozzle iterator. Takes any number of config files, directories of
+# config files or glob patterns in the NozzleIterator/config.json schema and runs every sweep on one shared
+# process pool, several configs at a time, then writes the winning nozzle and timing of each config to a
+# JSON or CSV file. Does not import tkinter so it can run on machines without a display.
+#
+# Usage, from the OpenProp_GUI directory:
+#   python -m NozzleIterator.batch_runner studies/*.json --output results.csv --workers 8
+
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from . import NozzleIterator
+from .SweepReducer import preferenceScore
+
+REQUIRED_SECTIONS = ["Propellant", "Grains", "Motor", "Nozzle"]
+
+# Columns written for each config, in order. 'points' is the number of nozzles simulated, which is less than the size
+# of the sweep grid when the pre-screen or throat search drops some or a result store already has them.
+RESULT_FIELDS = ["config", "status", "error", "throat", "throatLength", "convAngle", "preference", "score",
+                 "ISP", "impulse", "maxPressure", "averageThrust", "burnTime", "points", "elapsed",
+                 "rankCorrelation", "winnerChanged"]
+
+# Brief - Expands files, directories and glob patterns into a sorted list of json config paths
+# param paths - list of paths or patterns from the command line
+def findConfigs(paths):
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(glob.glob(os.path.join(path, "*.json")))
+        elif glob.has_magic(path):
+            found.update(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+        elif os.path.isfile(path):
+            found.add(path)
+        else:
+            raise FileNotFoundError("No config found at " + path)
+    return sorted(found)
+
+# Brief - Loads a config file and checks that it has the sections the nozzle iterator needs
+def loadConfig(path):
+    with open(path, "r") as f:
+        config = json.load(f)
+    missing = [key for key in REQUIRED_SECTIONS if key not in config]
+    if missing:
+        raise ValueError("Config is missing " + ", ".join(missing))
+    return config
+
+# Brief - Runs the nozzle iterator on a single config file using the shared process pool
+# param path - path of the config file
+# param executor - process pool shared between all configs
+# return - dictionary with an entry for each of RESULT_FIELDS
+def runConfig(path, executor):
+    record = {field: None for field in RESULT_FIELDS}
+    record["config"] = path
+    start_time = time.perf_counter()
+
+    # Every stage of the sweep calls back once for each point it simulates
+    simulated = 0
+    def countPoint(job):
+        nonlocal simulated
+        simulated += 1
+
+    try:
+        NIconfig = loadConfig(path)
+        simRes, nozzle, nozzleConfig = NozzleIterator.main(NIconfig, onProgress=countPoint, executor=executor)
+        record["points"] = simulated
+        record["preference"] = nozzleConfig["preference"]
+        report = nozzleConfig.get("fidelity_report")
+        if report is not None:
+            record["rankCorrelation"] = report["rankCorrelation"]
+            record["winnerChanged"] = report["winnerChanged"]
+        if simRes is None:
+            record["status"] = "no valid nozzle"
+        else:
+            record["status"] = "ok"
+            record["throat"] = nozzle["throat"]
+            record["throatLength"] = nozzle["throatLength"]
+            record["convAngle"] = nozzle["convAngle"]
+            record["score"] = float(preferenceScore(nozzleConfig["preference"], simRes, nozzle))
+            record["ISP"] = float(simRes.getISP())
+            record["impulse"] = float(simRes.getImpulse())
+            record["maxPressure"] = float(simRes.getMaxPressure())
+            record["averageThrust"] = float(simRes.getAverageForce())
+            record["burnTime"] = float(simRes.getBurnTime())
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["elapsed"] = time.perf_counter() - start_time
+    return record
+
+# Brief - Writes the results to a .json or .csv file depending on its extension
+def writeResults(records, path):
+    if path.lower().endswith(".csv"):
+        with open(path, mode="w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, "w") as f:
+            json.dump(records, f, indent=4)
+
+# Brief - Runs every config, several at a time, on one shared process pool
+# param configPaths - list of config file paths
+# param workers - number of worker processes, defaults to the number of cpus
+# param concurrentConfigs - number of configs being swept at once, defaults to the number of workers
+# param log - optional callable given a line of text as each config finishes
+# return - list of result records in the order of configPaths
+def runBatch(configPaths, workers=None, concurrentConfigs=None, log=None):
+    workers = workers or os.cpu_count() or 1
+    concurrentConfigs = concurrentConfigs or workers
+
+    records = [None] * len(configPaths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # Each config is driven from its own thread, the simulations themselves all go to the shared pool
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrentConfigs) as drivers:
+            futures = {drivers.submit(runConfig, path, executor): index for index, path in enumerate(configPaths)}
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                records[futures[future]] = record
+                if log is not None:
+                    log(f"{record['config']}: {record['status']} in {record['elapsed']:.1f} s")
+    return records
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Run the nozzle iterator headless over many config files.")
+    parser.add_argument("configs", nargs="+", help="config files, directories of config files or glob patterns")
+    parser.add_argument("-o", "--output", default="nozzle_results.json",
+                        help="results file, written as CSV if it ends in .csv and JSON otherwise")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of simulation processes")
+    parser.add_argument("-c", "--concurrent-configs", type=int, default=None,
+                        help="number of configs swept at the same time, defaults to the number of workers")
+    args = parser.parse_args(argv)
+
+    configPaths = findConfigs(args.configs)
+    if not configPaths:
+        parser.error("no config files found")
+
+    start_time = time.perf_counter()
+    records = runBatch(configPaths, args.workers, args.concurrent_configs, log=print)
+    writeResults(records, args.output)
+
+    failed = sum(1 for record in records if record["status"] == "error")
+    print(f"{len(records)} configs in {time.perf_counter() - start_time:.1f} s, {failed} failed, results in {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(cli())
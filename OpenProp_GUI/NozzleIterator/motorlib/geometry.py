@@ -70,3 +70,16 @@ def clean(contour, mapSize, tolerance):
 def dist(point1, point2):
     """Returns the distance between two points [x1, y1], [x2, y2]"""
     return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+
+def segmentDistance(pointsX, pointsY, start, end):
+    """Returns the distance from each of the points given by the arrays 'pointsX' and 'pointsY' to the line segment
+    running from point 'start' to point 'end'. 'start' and 'end' can also be arrays of points along their last axis,
+    for many segments at once, which broadcast against the points."""
+    startX, startY = np.asarray(start)[..., 0], np.asarray(start)[..., 1]
+    segX, segY = np.asarray(end)[..., 0] - startX, np.asarray(end)[..., 1] - startY
+    segLengthSquared = segX ** 2 + segY ** 2
+    # Position of the closest point along the segment, clamped to its ends. A segment of no length is just its start.
+    along = ((pointsX - startX) * segX + (pointsY - startY) * segY) / np.where(segLengthSquared == 0, 1,
+                                                                               segLengthSquared)
+    along = np.clip(along, 0, 1)
+    return np.hypot(pointsX - (startX + along * segX), pointsY - (startY + along * segY))
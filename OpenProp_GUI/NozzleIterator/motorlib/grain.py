@@ -2,6 +2,9 @@
 should be instantiated directly."""
 
 from abc import abstractmethod
+import copy
+import functools
+import threading
 
 import numpy as np
 import skfmm
@@ -11,12 +14,103 @@ from scipy import interpolate
 
 from . import geometry
 from .simResult import SimAlert, SimAlertLevel, SimAlertType
-from .properties import FloatProperty, EnumProperty, PropertyCollection
+from .properties import FloatProperty, EnumProperty, PropertyCollection, makeSnapshot
+
+# Serializes map generation so grains shared between motor clones are only set up once
+fmmSetupLock = threading.Lock()
+
+# Number of regression depths the core perimeter is measured at when a grain releases its maps after setup
+LEAN_PERIMETER_SAMPLES = 128
+
+# Number of evenly spaced offsets across one cell that the face area is averaged over when the core map is supersampled
+PARTIAL_CELL_OFFSETS = 8
+
+# Distance in pixels from the casing within which contour segments are not counted as core perimeter. Stray contours
+# run along the stair stepped casing of a plain map, while the casing of a supersampled map is smooth enough that a
+# pixel is left out, which matters as the front sweeps along the casing late in the burn.
+CASING_TOLERANCE = 3
+SUPERSAMPLED_CASING_TOLERANCE = 1
+
+# Number of map rows binned at a time when the face area profile is accumulated from the regression map
+PROFILE_CHUNK_ROWS = 256
+
+# Number of polled depths the face area profile is smoothed over
+FACE_AREA_WINDOW = 31
+
+# Number of map rows whose supersampled core map is generated at a time when building a coverage map
+COVERAGE_CHUNK_ROWS = 64
+
+# Holds the GeometryCache that is active on each thread
+activeGeometryCache = threading.local()
+
+class GeometryCache:
+    """Memoizes the geometry methods of every grain while a simulation runs, so each quantity is only calculated
+    once per grain and regression depth no matter how many other methods ask for it. Results are kept for the current
+    and the previous timestep, as a grain's state at the end of one step is its state at the start of the next. The
+    cache only applies on the thread that entered it, so grains shared with other simulations are unaffected."""
+    def __init__(self):
+        self.current = {}
+        self.previous = {}
+        self.outer = None
+
+    def __enter__(self):
+        self.outer = getattr(activeGeometryCache, 'cache', None)
+        activeGeometryCache.cache = self
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        activeGeometryCache.cache = self.outer
+
+    def nextStep(self):
+        """Starts a new timestep, dropping the results that are more than a step old."""
+        self.previous, self.current = self.current, {}
+
+    def get(self, key, method, args):
+        """Returns the result of method(*args) stored under 'key', calculating it if it isn't stored."""
+        if key in self.current:
+            return self.current[key]
+        value = self.previous[key] if key in self.previous else method(*args)
+        self.current[key] = value
+        return value
+
+def cachedGeometry(method):
+    """Wraps a grain method so its results come from the active GeometryCache, if there is one. Results are keyed
+    by the grain, the class that defines the method and the arguments, so a method calling the one it overrides gets
+    that method's result rather than its own."""
+    @functools.wraps(method)
+    def cached(self, *args, **kwargs):
+        cache = getattr(activeGeometryCache, 'cache', None)
+        if cache is None or kwargs:
+            return method(self, *args, **kwargs)
+        return cache.get((id(self), method.__qualname__, args), method, (self,) + args)
+    cached.geometryCached = True
+    return cached
+
+def isMirrored(masked, axis):
+    """Returns True if the masked map is unchanged by flipping it along 'axis', comparing only the unmasked values."""
+    mask = np.ma.getmaskarray(masked)
+    if not np.array_equal(mask, np.flip(mask, axis)):
+        return False
+    data = np.where(mask, 0, np.ma.getdata(masked))
+    return np.array_equal(data, np.flip(data, axis))
 
 class Grain(PropertyCollection):
     """A basic propellant grain. This is the class that all grains inherit from. It provides a few properties and
     composed methods but otherwise it is up to the subclass to make a functional grain."""
     geomName = None
+    # Methods whose results depend on nothing but the grain's properties and their arguments. Every grain class has
+    # them wrapped with cachedGeometry.
+    geometryMethods = ('getVolumeSlice', 'getSurfaceAreaAtRegression', 'getVolumeAtRegression', 'getWebLeft',
+                       'isWebLeft', 'getEndPositions', 'getPortArea', 'getRegressedLength', 'getGrainBoundingVolume',
+                       'getFreeVolume')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.geometryMethods:
+            method = getattr(cls, name)
+            if not getattr(method, 'geometryCached', False):
+                setattr(cls, name, cachedGeometry(method))
+
     def __init__(self):
         super().__init__()
         self.props['diameter'] = FloatProperty('Diameter', 'm', 0, 1)
@@ -75,6 +169,41 @@ class Grain(PropertyCollection):
     def simulationSetup(self, config):
         """Do anything needed to prepare this grain for simulation"""
 
+    def getSnapshot(self):
+        """Adds the flags 'topExposed' and 'bottomExposed' to the snapshot of grains that have an 'inhibitedEnds'
+        property, so the geometry methods don't have to compare its value against strings."""
+        values = self.getProperties()
+        if 'inhibitedEnds' in values:
+            values['topExposed'] = values['inhibitedEnds'] in ('Neither', 'Bottom')
+            values['bottomExposed'] = values['inhibitedEnds'] in ('Neither', 'Top')
+        return makeSnapshot(values)
+
+    def getSetupKey(self, config):
+        """Returns what the result of simulationSetup with 'config' depends on, so that grains with equal keys can
+        share one setup through shareSetup. Returns None by default, for grains whose setup is cheap enough to run
+        for each of them."""
+        return None
+
+    def shareSetup(self, grain):
+        """Takes on the simulation setup of 'grain', which has already been set up and has the same setup key."""
+
+    def initialSetup(self, config):
+        """Does the part of simulationSetup that getInitialGeometry needs. This is the full setup by default, which is
+        cheap for grains with analytic geometry, but grains with an expensive setup can skip what only matters once
+        the grain has started to regress. Grains with equal setup keys can share it through shareSetup as well."""
+        self.simulationSetup(config)
+
+    def faceSetup(self, config):
+        """Does the part of simulationSetup that a simulation reading the web, volume and surface area from a
+        BurnProfile still needs, which is the face and port areas and the web of the grain. This is the full setup by
+        default, but grains that keep those when pickled can skip it if they were set up before."""
+        self.simulationSetup(config)
+
+    def getInitialGeometry(self):
+        """Returns the grain's burning surface area, propellant volume and port area before it has regressed, for
+        quick results that don't need the rest of the burn. Requires initialSetup or simulationSetup to have run."""
+        return self.getSurfaceAreaAtRegression(0), self.getVolumeAtRegression(0), self.getPortArea(0)
+
     def getGeometryErrors(self):
         """Returns a list of simAlerts that detail any issues with the geometry of the grain. Errors should be
         used for any condition that prevents simulation of the grain, while warnings can be used to notify the
@@ -89,7 +218,7 @@ class Grain(PropertyCollection):
 
     def getGrainBoundingVolume(self):
         """Returns the volume of the bounding cylinder around the grain"""
-        return geometry.cylinderVolume(self.props['diameter'].getValue(), self.props['length'].getValue())
+        return geometry.cylinderVolume(self.params.diameter, self.params.length)
 
     def getFreeVolume(self, regDist):
         """Returns the amount of empty (non-propellant) volume in bounding cylinder of the grain for a given regression
@@ -101,22 +230,17 @@ class PerforatedGrain(Grain):
     """A grain with a hole of some shape through the center. Adds abstract methods related to the core to the
     basic grain class """
     geomName = 'perfGrain'
+    geometryMethods = Grain.geometryMethods + ('getCorePerimeter', 'getFaceArea', 'getCoreSurfaceArea')
     def __init__(self):
         super().__init__()
         self.props['inhibitedEnds'] = EnumProperty('Inhibited ends', ['Neither', 'Top', 'Bottom', 'Both'])
         self.wallWeb = 0 # Max distance from the core to the wall
 
     def getEndPositions(self, regDist):
-        if self.props['inhibitedEnds'].getValue() == 'Neither': # Neither
-            return (regDist, self.props['length'].getValue() - regDist)
-        if self.props['inhibitedEnds'].getValue() == 'Top': # Top
-            return (0, self.props['length'].getValue() - regDist)
-        if self.props['inhibitedEnds'].getValue() == 'Bottom': # Bottom
-            return (regDist, self.props['length'].getValue())
-        if self.props['inhibitedEnds'].getValue() == 'Both':
-            return (0, self.props['length'].getValue())
-        # The enum should prevent this from even being raised, but to cover the case where it somehow gets set wrong
-        raise ValueError('Invalid number of faces inhibited')
+        params = self.params
+        forward = regDist if params.topExposed else 0
+        aft = params.length - regDist if params.bottomExposed else params.length
+        return (forward, aft)
 
     @abstractmethod
     def getCorePerimeter(self, regDist):
@@ -135,7 +259,7 @@ class PerforatedGrain(Grain):
 
     def getWebLeft(self, regDist):
         wallLeft = self.wallWeb - regDist
-        if self.props['inhibitedEnds'].getValue() == 'Both':
+        if not (self.params.topExposed or self.params.bottomExposed):
             return wallLeft
         lengthLeft = self.getRegressedLength(regDist)
         return min(lengthLeft, wallLeft)
@@ -144,11 +268,7 @@ class PerforatedGrain(Grain):
         faceArea = self.getFaceArea(regDist)
         coreArea = self.getCoreSurfaceArea(regDist)
 
-        exposedFaces = 2
-        if self.props['inhibitedEnds'].getValue() == 'Top' or self.props['inhibitedEnds'].getValue() == 'Bottom':
-            exposedFaces = 1
-        if self.props['inhibitedEnds'].getValue() == 'Both':
-            exposedFaces = 0
+        exposedFaces = self.params.topExposed + self.params.bottomExposed
 
         return coreArea + (exposedFaces * faceArea)
 
@@ -158,11 +278,11 @@ class PerforatedGrain(Grain):
 
     def getPortArea(self, regDist):
         faceArea = self.getFaceArea(regDist)
-        uncored = geometry.circleArea(self.props['diameter'].getValue())
+        uncored = geometry.circleArea(self.params.diameter)
         return uncored - faceArea
 
     def getMassFlux(self, massIn, dTime, regDist, dRegDist, position, density):
-        diameter = self.props['diameter'].getValue()
+        diameter = self.params.diameter
 
         endPos = self.getEndPositions(regDist)
         # If a position above the top face is queried, the mass flow is just the input mass and the
@@ -172,7 +292,7 @@ class PerforatedGrain(Grain):
         # If a position in the grain is queried, the mass flow is the input mass, from the top face,
         # and from the tube up to the point. The diameter is the core.
         if position <= endPos[1]:
-            if self.props['inhibitedEnds'].getValue() in ('Top', 'Both'):
+            if not self.params.topExposed:
                 top = 0
                 countedCoreLength = position
             else:
@@ -206,6 +326,9 @@ class FmmGrain(PerforatedGrain):
     """A grain that uses the fast marching method to calculate its regression. All a subclass has to do is
     provide an implementation of generateCoreMap that makes an image of a cross section of the grain."""
     geomName = 'fmmGrain'
+    # True if generateCoreMap only looks at self.mapX and self.mapY point by point, so it can be run on some of the
+    # map's rows at a time
+    pointwiseCoreMap = True
     def __init__(self):
         super().__init__()
         self.mapDim = 1001
@@ -214,79 +337,378 @@ class FmmGrain(PerforatedGrain):
         self.coreMap = None
         self.regressionMap = None
         self.faceArea = None
+        self.faceAreaFunc = None
+        self.supersample = 1
+        self.casingCoverage = None
+        self.perimeterLevels = None
+        self.perimeterFunc = None
+        self.setupKey = None
+        self.faceAreaKey = None # Setup key of the face area table and wall web, which outlive the maps
+        self.initialFaceArea = None # Set by initialSetup, along with the two below
+        self.initialPerimeter = None
+        self.initialKey = None
+
+    def __getstate__(self):
+        """Leaves the maps out when the grain is pickled or copied, as they are large and simulationSetup rebuilds
+        them. The face area table is small and kept so port areas can still be read from unpickled results, and so
+        that faceSetup can skip the maps. A lean grain needs nothing but its profiles to simulate, so it stays set
+        up."""
+        state = super().__getstate__()
+        for key in ('mapX', 'mapY', 'mask', 'coreMap', 'casingCoverage', 'regressionMap'):
+            state[key] = None
+        if self.perimeterFunc is None:
+            state['setupKey'] = None
+        return state
 
     def normalize(self, value):
         """Transforms real unit quantities into self.mapX, self.mapY coordinates. For use in indexing into the
         coremap."""
-        return value / (0.5 * self.props['diameter'].getValue())
+        return value / (0.5 * self.params.diameter)
 
     def unNormalize(self, value):
         """Transforms self.mapX, self.mapY coordinates to real unit quantities. Used to determine real lengths in
         coremap."""
-        return (value / 2) * self.props['diameter'].getValue()
+        return (value / 2) * self.params.diameter
 
     def lengthToMap(self, value):
         """Converts meters to pixels. Used to compare real distances to pixel distances in the regression map."""
-        return self.mapDim * (value / self.props['diameter'].getValue())
+        return self.mapDim * (value / self.params.diameter)
 
     def mapToLength(self, value):
         """Converts pixels to meters. Used to extract real distances from pixel distances such as contour lengths"""
-        return self.props['diameter'].getValue() * (value / self.mapDim)
+        return self.params.diameter * (value / self.mapDim)
 
     def areaToMap(self, value):
         """Used to convert sqm to sq pixels, like on the regression map."""
-        return (self.mapDim ** 2) * (value / (self.props['diameter'].getValue() ** 2))
+        return (self.mapDim ** 2) * (value / (self.params.diameter ** 2))
 
     def mapToArea(self, value):
         """Used to convert sq pixels to sqm. For extracting real areas from the regression map."""
-        return (self.props['diameter'].getValue() ** 2) * (value / (self.mapDim ** 2))
+        return (self.params.diameter ** 2) * (value / (self.mapDim ** 2))
 
-    def initGeometry(self, mapDim):
-        """Set up an empty core map and reset the regression map. Takes in the dimension of both maps."""
+    def initGeometry(self, mapDim, supersample=1, dtype=np.float64):
+        """Set up an empty core map and reset the regression map. Takes in the dimension of both maps. With a
+        'supersample' above 1 the map points are placed at the centers of mapDim equal cells spanning the grain, which
+        is the spacing the map to real unit conversions assume, so that generateCoverageMap can split each cell evenly.
+        The maps are stored with the floating point type 'dtype'."""
         if mapDim < 64:
             raise ValueError('Map dimension must be 64 or larger to get good results')
+        self.freezeParameters() # The maps are made from the current properties
         self.mapDim = mapDim
-        self.mapX, self.mapY = np.meshgrid(np.linspace(-1, 1, self.mapDim), np.linspace(-1, 1, self.mapDim))
+        self.supersample = supersample
+        if supersample > 1:
+            axis = ((np.arange(self.mapDim) + 0.5) * (2 / self.mapDim)) - 1
+        else:
+            axis = np.linspace(-1, 1, self.mapDim)
+        # Mirrored points of the axis can differ by a rounding error, which is enough to flip cells on the edge of a
+        # core and break the symmetry of its map. Subtracting the reversed axis makes it exactly antisymmetric.
+        axis = (axis - axis[::-1]) / 2
+        self.mapX, self.mapY = np.meshgrid(axis.astype(dtype), axis.astype(dtype))
         self.mask = self.mapX**2 + self.mapY**2 > 1
         self.coreMap = np.ones_like(self.mapX)
+        self.casingCoverage = None
         self.regressionMap = None
+        self.perimeterLevels = None
+        self.perimeterFunc = None
+        self.setupKey = None
+        self.faceAreaKey = None
 
     @abstractmethod
     def generateCoreMap(self):
         """Use self.mapX and self.mapY to generate an image of the grain cross section in self.coreMap. A 0 in the image
         means propellant, and a 1 means no propellant."""
 
+    def generateCoverageMap(self):
+        """Runs generateCoreMap on a grid with self.supersample points per cell along each axis and averages them
+        down, so that self.coreMap holds the fraction of each cell that is propellant instead of a hard 0 or 1. The
+        fraction of each cell inside the casing is stored in self.casingCoverage, and only cells entirely outside it
+        are masked. The fine grid is made COVERAGE_CHUNK_ROWS rows of the map at a time if the grain's core map is
+        pointwise."""
+        mapDim, samples = self.mapDim, self.supersample
+        mapX, mapY = self.mapX, self.mapY
+        coverage = np.empty_like(mapX)
+        casingCoverage = np.empty_like(mapX)
+
+        fineDim = mapDim * samples
+        fineAxis = ((np.arange(fineDim) + 0.5) * (2 / fineDim)) - 1
+        fineAxis = ((fineAxis - fineAxis[::-1]) / 2).astype(mapX.dtype) # Exactly antisymmetric, see initGeometry
+        chunkRows = COVERAGE_CHUNK_ROWS if self.pointwiseCoreMap else mapDim
+        self.mapDim = fineDim
+        try:
+            for start in range(0, mapDim, chunkRows):
+                rows = slice(start, min(start + chunkRows, mapDim))
+                numRows = rows.stop - rows.start
+                self.mapX, self.mapY = np.meshgrid(fineAxis, fineAxis[rows.start * samples:rows.stop * samples])
+                self.coreMap = np.ones_like(self.mapX)
+                self.generateCoreMap()
+                inCasing = self.mapX**2 + self.mapY**2 <= 1
+                coverage[rows] = self.coreMap.reshape(numRows, samples, mapDim, samples).mean(axis=(1, 3))
+                casingCoverage[rows] = inCasing.reshape(numRows, samples, mapDim, samples).mean(axis=(1, 3))
+        finally:
+            self.mapDim = mapDim
+            self.mapX, self.mapY = mapX, mapY
+        self.coreMap = coverage
+        self.casingCoverage = casingCoverage
+        self.mask = self.casingCoverage == 0
+
     def simulationSetup(self, config):
+        """Generates the core and regression maps. They only depend on the settings in getSetupKey, so they are
+        reused if none of those changed since the last setup. This lets motors made with Motor.clone share the
+        grain without regenerating its maps for every simulation. If the config's 'leanGrainMaps' is set, the core
+        perimeter is tabulated and the maps are released, leaving only 1D profiles behind. A 'mapSupersample' above 1
+        builds a fractional coverage core map, see generateCoverageMap, which places the core's edge to within a
+        fraction of a cell and so reaches the accuracy of a much larger plain map. 'singlePrecisionMaps' stores the
+        maps as float32, halving their memory for large map sizes."""
         mapSize = config.getProperty("mapDim")
+        supersample = config.getProperty("mapSupersample") or 1
+        dtype = np.float32 if config.getProperty("singlePrecisionMaps") else np.float64
+        setupKey = self.getSetupKey(config)
+
+        with fmmSetupLock:
+            if self.setupKey == setupKey:
+                return
+            lean = setupKey[1]
+            self.initGeometry(mapSize, supersample, dtype)
+            if supersample > 1:
+                self.generateCoverageMap()
+            else:
+                self.generateCoreMap()
+            self.generateRegressionMap(self.usesCoreDistance(config))
+            if lean:
+                self.generatePerimeterProfile()
+                self.releaseMaps()
+            self.setupKey = setupKey
+            self.faceAreaKey = setupKey
+
+    def getSetupKey(self, config):
+        """The maps depend on the map settings and the cross section of the grain, so every property but the length
+        and inhibited ends is part of the key."""
+        properties = copy.deepcopy(self.getProperties())
+        del properties['length'], properties['inhibitedEnds']
+        return (config.getProperty("mapDim"), bool(config.getProperty("leanGrainMaps")),
+                config.getProperty("mapSupersample") or 1, bool(config.getProperty("singlePrecisionMaps")),
+                self.usesCoreDistance(config), properties)
+
+    def shareSetup(self, grain):
+        """Points this grain at the maps and profiles of 'grain' rather than copying them. They are never changed in
+        place, only replaced by the next setup."""
+        with fmmSetupLock:
+            for key in ('mapDim', 'supersample', 'mapX', 'mapY', 'mask', 'coreMap', 'casingCoverage', 'regressionMap',
+                        'wallWeb', 'faceArea', 'faceAreaFunc', 'perimeterLevels', 'perimeterFunc', 'setupKey',
+                        'faceAreaKey', 'initialFaceArea', 'initialPerimeter', 'initialKey'):
+                setattr(self, key, getattr(grain, key))
+
+    def initialSetup(self, config):
+        """Measures the face area and core perimeter before regression without the full regression map that the
+        setup spends most of its time on. Nothing is measured if the grain is already set up for 'config'. The face
+        area at ignition is smoothed over the first FACE_AREA_WINDOW depths of the profile, so the regression map is
+        only made as far from the core as they reach, see generateRegressionMap. The values are then the same as those
+        of a full setup. The maps are released afterwards."""
+        setupKey = self.getSetupKey(config)
+        mapSize = config.getProperty("mapDim")
+        supersample = config.getProperty("mapSupersample") or 1
+        dtype = np.float32 if config.getProperty("singlePrecisionMaps") else np.float64
+
+        with fmmSetupLock:
+            if self.setupKey == setupKey:
+                self.initialFaceArea, self.initialPerimeter = None, None
+                return
+            if self.initialFaceArea is not None and self.initialKey == setupKey:
+                return
+            self.initGeometry(mapSize, supersample, dtype)
+            if supersample > 1:
+                self.generateCoverageMap()
+            else:
+                self.generateCoreMap()
+            # The smoothing of the face area also reaches half a cell past the last depth when the map is supersampled
+            self.generateRegressionMap(self.usesCoreDistance(config), (FACE_AREA_WINDOW + 1) / self.mapDim)
+            self.initialFaceArea = float(self.getFaceArea(0))
+            self.initialPerimeter = self.getCorePerimeter(0)
+            self.releaseMaps()
+            self.initialKey = setupKey
+
+    def faceSetup(self, config):
+        """Runs simulationSetup unless the face area table and wall web are from a setup for 'config'. They are kept
+        when the grain is pickled, so a grain set up before it is sent to another process doesn't make its maps again
+        there to be simulated from a BurnProfile."""
+        if self.faceAreaKey != self.getSetupKey(config):
+            self.simulationSetup(config)
+
+    def getInitialGeometry(self):
+        if self.initialFaceArea is None:
+            return super().getInitialGeometry()
+        params = self.params
+        exposedFaces = params.topExposed + params.bottomExposed
+        surfaceArea = (self.initialPerimeter * params.length) + (exposedFaces * self.initialFaceArea)
+        portArea = geometry.circleArea(params.diameter) - self.initialFaceArea
+        return surfaceArea, self.initialFaceArea * params.length, portArea
+
+    def generatePerimeterProfile(self, samples=LEAN_PERIMETER_SAMPLES):
+        """Measures the core perimeter at evenly spaced regression depths from the regression map so that
+        getCorePerimeter can interpolate it once the maps are released."""
+        maxDist = np.amax(self.regressionMap)
+        self.perimeterLevels = np.linspace(0, maxDist, samples)
+        perimeter = [self.getCorePerimeter(self.unNormalize(level)) for level in self.perimeterLevels]
+        self.perimeterFunc = interpolate.interp1d(self.perimeterLevels, perimeter)
 
-        self.initGeometry(mapSize)
-        self.generateCoreMap()
-        self.generateRegressionMap()
+    def releaseMaps(self):
+        """Drops the 2D maps, keeping the face area and perimeter profiles that simulation needs. The maps are made
+        again by getFaceImage and getRegressionData when they are displayed."""
+        self.mapX, self.mapY = None, None
+        self.mask = None
+        self.coreMap = None
+        self.casingCoverage = None
+        self.regressionMap = None
 
-    def generateRegressionMap(self):
+    def getCoreDistanceMap(self):
+        """Returns the exact distance from every point of self.mapX, self.mapY to the core in map coordinates, 0 inside
+        the core, for grains whose core is simple enough to have one. Returns None by default, in which case the
+        regression map comes from the fast marching method on the core map."""
+        return None
+
+    def usesCoreDistance(self, config=None):
+        """Returns True if the regression map should be taken from getCoreDistanceMap rather than from the fast
+        marching method. The exact distances give slightly different results to the fast marching method, so they are
+        only used when the motor config's 'exactCoreDistance' is set."""
+        return config is not None and bool(config.getProperty("exactCoreDistance"))
+
+    def getSymmetryOrder(self):
+        """Returns the order of the rotational symmetry of the grain's core, or 1 if it has none. A grain that returns
+        more than 1 must also be mirror symmetric about the map's Y axis, and about its X axis when the order is even,
+        as its regression is then computed on half or a quarter of the map and mirrored back. Only the fast marching
+        method uses it, so it has no effect when the regression map comes from getCoreDistanceMap, see
+        usesCoreDistance. calcSectorDistance still checks each mirror on the map itself, as rounding in the geometry
+        can leave the raster of a symmetric core slightly off."""
+        return 1
+
+    def calcSectorDistance(self, masked, cellSize, band=None):
+        """Runs the fast marching method on the smallest part of the masked core map that the grain's symmetry allows
+        and mirrors the distances back out to the full map. A symmetry axis at the edge of the part acts as a
+        reflecting boundary, so the result is the same as marching over the whole map for a fraction of the cost. The
+        masked map can also be a part of the map centered on it. If 'band' is given, the march stops that far from the
+        core and the cells it didn't reach are masked. A mirror the masked map doesn't match exactly is not used, so
+        an asymmetric raster costs speed rather than accuracy."""
+        order = self.getSymmetryOrder()
+        # Mirror across the Y axis, map columns are flipped
+        mirrorX = order > 1 and isMirrored(masked, 1)
+        # Mirror across the X axis, map rows are flipped
+        mirrorY = order > 1 and order % 2 == 0 and isMirrored(masked, 0)
+        size = masked.shape[0]
+        half = size // 2
+        onAxis = size % 2 # With an odd map size the middle row and column lie on the axes and are not repeated
+
+        sector = masked[half if mirrorY else 0:, half if mirrorX else 0:]
+        # skfmm needs contiguous arrays, it returns wrong distances for a strided view
+        sector = np.ma.MaskedArray(np.ascontiguousarray(np.ma.getdata(sector)),
+                                   np.ascontiguousarray(np.ma.getmaskarray(sector)))
+        distance = skfmm.distance(sector, dx=cellSize, narrow=0 if band is None else band)
+
+        if mirrorX:
+            distance = np.ma.concatenate([np.flip(distance[:, onAxis:], axis=1), distance], axis=1)
+        if mirrorY:
+            distance = np.ma.concatenate([np.flip(distance[onAxis:, :], axis=0), distance], axis=0)
+        return distance
+
+    def calcBandDistance(self, masked, cellSize, band):
+        """Returns the regression map of calcSectorDistance up to 'band' from the core, in map coordinates. Every cell
+        that close to the core is within the band of the core's bounding box, so the march only runs on the part of
+        the map centered on it that holds the box and the band. The cells the march didn't reach are given a depth of
+        'band' on the side of the core they are on."""
+        size = masked.shape[0]
+        data = np.ma.getdata(masked)
+        core = np.logical_and(data <= 0, np.logical_not(np.ma.getmaskarray(masked)))
+        rows, cols = np.flatnonzero(np.any(core, axis=1)), np.flatnonzero(np.any(core, axis=0))
+        trim = 0
+        if len(rows) > 0:
+            edge = min(rows[0], cols[0], size - 1 - rows[-1], size - 1 - cols[-1])
+            # The march goes a cell past the band before it stops, so a few are left to spare
+            trim = max(edge - int(np.ceil(band / (2 * cellSize))) - 2, 0)
+        part = slice(trim, size - trim)
+
+        distance = np.where(data < 0, -band, band)
+        reached = self.calcSectorDistance(masked[part, part], cellSize, band / 2) * 2
+        np.copyto(distance[part, part], np.ma.getdata(reached), where=np.logical_not(np.ma.getmaskarray(reached)))
+        return np.ma.MaskedArray(distance, np.ma.getmaskarray(masked))
+
+    def generateRegressionMap(self, exactDistance=False, band=None):
         """Uses the fast marching method to generate an image of how the grain regresses from the core map. The map
-        is stored under self.regressionMap."""
-        masked = np.ma.MaskedArray(self.coreMap, self.mask)
-        cellSize = 1 / self.mapDim
-        self.regressionMap = skfmm.distance(masked, dx=cellSize) * 2
+        is stored under self.regressionMap. If 'exactDistance' is set, the grain's getCoreDistanceMap is used instead
+        when it has one. A 'band' in map coordinates stops the fast marching method that far from the core and gives
+        the cells past it a depth of 'band', so only the face area profile up to it is right, see initialSetup."""
+        distance = self.getCoreDistanceMap() if exactDistance else None
+        if distance is None:
+            if self.casingCoverage is None:
+                masked = np.ma.MaskedArray(self.coreMap, self.mask)
+            else:
+                # The propellant fraction less a half changes sign on the core's edge, and skfmm starts the front from
+                # where it interpolates that crossing between cells rather than from the centers of the core cells
+                masked = np.ma.MaskedArray(self.coreMap - 0.5, self.mask)
+            cellSize = 1 / self.mapDim
+            if band is None:
+                distance = self.calcSectorDistance(masked, cellSize) * 2
+            else:
+                distance = self.calcBandDistance(masked, cellSize, band)
+            # skfmm always returns double precision distances
+            self.regressionMap = distance.astype(self.mapX.dtype, copy=False)
+        else:
+            if self.casingCoverage is not None:
+                # The exact distance is 0 anywhere in the core, so cells centered in it get a depth below 0 from how
+                # little of them is propellant, like the fast marching distances of a coverage map have
+                coreDepth = np.minimum(self.coreMap - 0.5, 0) * (2 / self.mapDim)
+                distance = np.where(distance > 0, distance, coreDepth)
+            self.regressionMap = np.ma.MaskedArray(distance, self.mask)
         maxDist = np.amax(self.regressionMap)
         self.wallWeb = self.unNormalize(maxDist)
-        faceArea = []
-        polled = []
-        valid = np.logical_not(self.mask)
-        for i in range(int(maxDist * self.mapDim) + 2):
-            polled.append(i / self.mapDim)
-            faceArea.append(self.mapToArea(np.count_nonzero(np.logical_and(self.regressionMap > (i / self.mapDim), valid))))
-        self.faceArea = savgol_filter(faceArea, 31, 5)
+        # The face area at each polled depth is the number of valid cells that regress further than it
+        polled = np.arange(int(maxDist * self.mapDim) + 2) / self.mapDim
+        if self.casingCoverage is None:
+            cellsLeft = self.countCellsBeyond(polled)
+        else:
+            cellsLeft = self.countPartialCells(polled)
+        faceArea = self.mapToArea(cellsLeft)
+        self.faceArea = savgol_filter(faceArea, FACE_AREA_WINDOW, 5)
         self.faceAreaFunc = interpolate.interp1d(polled, self.faceArea)
 
+    def countCellsBeyond(self, thresholds, weights=None):
+        """Returns the number of valid cells of the regression map that regress further than each of the sorted
+        'thresholds', with each cell counted by its value in 'weights' if it is given. The map is gone through
+        PROFILE_CHUNK_ROWS rows at a time, binning the cells between the thresholds, so no copy of every depth on the
+        map is made or sorted."""
+        bins = np.zeros(len(thresholds) + 1)
+        for start in range(0, self.mapDim, PROFILE_CHUNK_ROWS):
+            rows = slice(start, start + PROFILE_CHUNK_ROWS)
+            valid = np.logical_not(np.logical_or(self.mask[rows], np.ma.getmaskarray(self.regressionMap[rows])))
+            # Number of thresholds below each cell's depth
+            index = np.searchsorted(thresholds, np.ma.getdata(self.regressionMap[rows])[valid], side='left')
+            bins += np.bincount(index, None if weights is None else weights[rows][valid], minlength=len(bins))
+        # A cell regresses further than threshold i if more than i thresholds are below its depth
+        return np.cumsum(bins[::-1])[::-1][1:]
+
+    def countPartialCells(self, polled):
+        """Returns how many cells are left to burn at each of the 'polled' depths when cells are only partly inside
+        the casing, as given by self.casingCoverage, and the front crosses each cell over a cell width of regression
+        instead of all at once. The weighted count is averaged over offsets spread across one cell width around each
+        depth."""
+        offsets = (((np.arange(PARTIAL_CELL_OFFSETS) + 0.5) / PARTIAL_CELL_OFFSETS) - 0.5) * (2 / self.mapDim)
+        thresholds = (polled[:, np.newaxis] + offsets).ravel()
+        order = np.argsort(thresholds)
+        counts = np.empty_like(thresholds)
+        counts[order] = self.countCellsBeyond(thresholds[order], self.casingCoverage)
+        return counts.reshape(len(polled), PARTIAL_CELL_OFFSETS).mean(axis=1)
+
     def getCorePerimeter(self, regDist):
         mapDist = self.normalize(regDist)
 
+        if self.regressionMap is None and self.perimeterFunc is not None:
+            if mapDist > self.perimeterLevels[-1]:
+                return 0 # Past burnout
+            return float(self.perimeterFunc(max(mapDist, 0)))
+
+        tolerance = SUPERSAMPLED_CASING_TOLERANCE if self.supersample > 1 else CASING_TOLERANCE
         corePerimeter = 0
         contours = measure.find_contours(self.regressionMap, mapDist, fully_connected='low')
         for contour in contours:
-            corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim))
+            corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim, tolerance))
 
         return corePerimeter
 
@@ -313,7 +735,7 @@ class FmmGrain(PerforatedGrain):
         contourLengths = {}
 
         try:
-            self.generateRegressionMap()
+            self.generateRegressionMap(self.usesCoreDistance())
 
             regmax = np.amax(self.regressionMap)
 
@@ -21,11 +21,11 @@ class BatesGrain(PerforatedGrain):
         self.wallWeb = (self.props['diameter'].getValue() - self.props['coreDiameter'].getValue()) / 2
 
     def getCorePerimeter(self, regDist):
-        return geometry.circlePerimeter(self.props['coreDiameter'].getValue() + (2 * regDist))
+        return geometry.circlePerimeter(self.params.coreDiameter + (2 * regDist))
 
     def getFaceArea(self, regDist):
-        outer = geometry.circleArea(self.props['diameter'].getValue())
-        inner = geometry.circleArea(self.props['coreDiameter'].getValue() + (2 * regDist))
+        outer = geometry.circleArea(self.params.diameter)
+        inner = geometry.circleArea(self.params.coreDiameter + (2 * regDist))
         return outer - inner
 
     def getDetailsString(self, lengthUnit='m'):
@@ -24,6 +24,13 @@ class CGrain(FmmGrain):
 
         self.coreMap[np.logical_and(np.abs(self.mapY) < slotWidth / 2, self.mapX > slotOffset)] = 0
 
+    def getCoreDistanceMap(self):
+        slotWidth = self.normalize(self.props['slotWidth'].getValue())
+        slotOffset = self.normalize(self.props['slotOffset'].getValue())
+
+        # Distance to the slot, which runs from the offset out through the casing
+        return np.hypot(np.maximum(slotOffset - self.mapX, 0), np.maximum(np.abs(self.mapY) - slotWidth / 2, 0))
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}'.format(self.props['length'].dispFormat(lengthUnit))
 
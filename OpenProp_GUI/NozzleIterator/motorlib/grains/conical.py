@@ -10,6 +10,7 @@ from ..properties import FloatProperty, EnumProperty
 class ConicalGrain(Grain):
     """A conical grain is similar to a BATES grain except it has different core diameters at each end."""
     geomName = "Conical"
+    geometryMethods = Grain.geometryMethods + ('isCoreInverted', 'getFrustumInfo')
     def __init__(self):
         super().__init__()
         self.props['forwardCoreDiameter'] = FloatProperty('Forward Core Diameter', 'm', 0, 1)
@@ -18,19 +19,19 @@ class ConicalGrain(Grain):
 
     def isCoreInverted(self):
         """A simple helper that returns 'true' if the core's foward diameter is larger than its aft diameter"""
-        return self.props['forwardCoreDiameter'].getValue() > self.props['aftCoreDiameter'].getValue()
+        return self.params.forwardCoreDiameter > self.params.aftCoreDiameter
 
     def getFrustumInfo(self, regDist):
         """Returns the dimensions of the grain's core at a given regression depth. The core is always a frustum and is
         returned as the forward diameter, aft diameter, and length"""
-        grainDiameter = self.props['diameter'].getValue()
-        aftDiameter = self.props['aftCoreDiameter'].getValue()
-        forwardDiameter = self.props['forwardCoreDiameter'].getValue()
-        grainLength = self.props['length'].getValue()
+        params = self.params
+        grainDiameter = params.diameter
+        aftDiameter = params.aftCoreDiameter
+        forwardDiameter = params.forwardCoreDiameter
+        grainLength = params.length
 
-        inhibitedEnds = self.props['inhibitedEnds'].getValue()
-        forward_exposed = (inhibitedEnds in ('Neither', 'Bottom'))
-        aft_exposed     = (inhibitedEnds in ('Neither', 'Top'))
+        forward_exposed = params.topExposed
+        aft_exposed     = params.bottomExposed
 
         # These calculations are easiest if we work in terms of the core's "large end" and "small end"
         if self.isCoreInverted():
@@ -75,10 +76,10 @@ class ConicalGrain(Grain):
         forwardDiameter, aftDiameter, length = self.getFrustumInfo(regDist)
         surfaceArea = geometry.frustumLateralSurfaceArea(forwardDiameter, aftDiameter, length)
 
-        fullFaceArea = geometry.circleArea(self.props['diameter'].getValue())
-        if self.props['inhibitedEnds'].getValue() in ('Neither', 'Bottom'):
+        fullFaceArea = geometry.circleArea(self.params.diameter)
+        if self.params.topExposed:
             surfaceArea += fullFaceArea - geometry.circleArea(forwardDiameter)
-        if self.props['inhibitedEnds'].getValue() in ('Neither', 'Top'):
+        if self.params.bottomExposed:
             surfaceArea += fullFaceArea - geometry.circleArea(aftDiameter)
 
         return surfaceArea
@@ -87,16 +88,16 @@ class ConicalGrain(Grain):
         """Returns the volume of propellant in the grain after it has regressed a linear distance 'regDist'"""
         forwardDiameter, aftDiameter, length = self.getFrustumInfo(regDist)
         frustumVolume = geometry.frustumVolume(forwardDiameter, aftDiameter, length)
-        outerVolume = geometry.cylinderVolume(self.props['diameter'].getValue(), length)
+        outerVolume = geometry.cylinderVolume(self.params.diameter, length)
 
         return outerVolume - frustumVolume
 
     def getWebLeft(self, regDist):
         """Returns the shortest distance the grain has to regress to burn out"""
         forwardDiameter, aftDiameter, length = self.getFrustumInfo(regDist)
-        wallLeft = (self.props['diameter'].getValue() - min(aftDiameter, forwardDiameter)) / 2
+        wallLeft = (self.params.diameter - min(aftDiameter, forwardDiameter)) / 2
 
-        if self.props['inhibitedEnds'].getValue() == 'Both':
+        if not (self.params.topExposed or self.params.bottomExposed):
             return wallLeft
 
         return min(wallLeft, length)
@@ -107,9 +108,9 @@ class ConicalGrain(Grain):
         position along the grain measured from the head end, and the density of the propellant."""
         unsteppedFrustum = self.getFrustumInfo(regDist)
         steppedFrustum = self.getFrustumInfo(regDist + dRegDist)
-        grainDiameter = self.props['diameter'].getValue()
-        aftUninhibited = (self.props['inhibitedEnds'].getValue() in ('Neither', 'Top'))
-        foreUninhibited = (self.props['inhibitedEnds'].getValue() in ('Neither', 'Bottom'))
+        grainDiameter = self.params.diameter
+        aftUninhibited = self.params.bottomExposed
+        foreUninhibited = self.params.topExposed
 
         if position > dRegDist:
             unsteppedPartialFrustum, _ = geometry.splitFrustum(*unsteppedFrustum, position - dRegDist * aftUninhibited)
@@ -150,13 +151,12 @@ class ConicalGrain(Grain):
     def getEndPositions(self, regDist):
         """Returns the positions of the grain ends relative to the original (unburned) grain top. Returns a tuple like
         (forward, aft)"""
-        originalLength = self.props['length'].getValue()
-        grainDiameter = self.props['diameter'].getValue()
+        originalLength = self.params.length
+        grainDiameter = self.params.diameter
         forwardCoreDiameter, aftCoreDiameter, currentLength = self.getFrustumInfo(regDist)
 
-        inhibitedEnds = self.props['inhibitedEnds'].getValue()
-        forward_exposed = (inhibitedEnds in ('Neither', 'Bottom'))
-        aft_exposed     = (inhibitedEnds in ('Neither', 'Top'))
+        forward_exposed = self.params.topExposed
+        aft_exposed     = self.params.bottomExposed
 
         # These calculations are easiest if we work in terms of the core's "large end" and "small end"
         if self.isCoreInverted():
@@ -1,5 +1,7 @@
 """D Grain submodule"""
 
+import numpy as np
+
 from ..grain import FmmGrain
 from ..properties import FloatProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
@@ -19,6 +21,12 @@ class DGrain(FmmGrain):
 
         self.coreMap[self.mapX > slotOffset] = 0
 
+    def getCoreDistanceMap(self):
+        slotOffset = self.normalize(self.props['slotOffset'].getValue())
+
+        # Distance to the chord
+        return np.maximum(slotOffset - self.mapX, 0)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Slot offset: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                     self.props['slotOffset'].dispFormat(lengthUnit))
@@ -8,12 +8,12 @@ class EndBurningGrain(Grain):
     geomName = 'End Burner'
 
     def getSurfaceAreaAtRegression(self, regDist):
-        diameter = self.props['diameter'].getValue()
+        diameter = self.params.diameter
         return geometry.circleArea(diameter)
 
     def getVolumeAtRegression(self, regDist):
         bLength = self.getRegressedLength(regDist)
-        diameter = self.props['diameter'].getValue()
+        diameter = self.params.diameter
         return geometry.cylinderVolume(diameter, bLength)
 
     def simulationSetup(self, config):
@@ -29,4 +29,4 @@ class EndBurningGrain(Grain):
         return None
 
     def getEndPositions(self, regDist):
-        return (0, self.props['length'].getValue() - regDist)
+        return (0, self.params.length - regDist)
@@ -46,6 +46,10 @@ class Finocyl(FmmGrain):
             # For inverted fins, we are filling propellant back in. For regular fins, we are removing it.
             self.coreMap[np.logical_and(vect, ends)] = invertedFins
 
+    def getSymmetryOrder(self):
+        # The first fin lies along the Y axis, every fin is mirror symmetric about its own axis
+        return max(self.props['numFins'].getValue(), 1)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Core: {}, Fins: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                        self.props['coreDiameter'].dispFormat(lengthUnit),
@@ -1,5 +1,7 @@
 """Moon burning grain submodule"""
 
+import numpy as np
+
 from ..grain import FmmGrain
 from ..properties import FloatProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
@@ -19,6 +21,13 @@ class MoonBurner(FmmGrain):
         # Open up core
         self.coreMap[(self.mapX - coreOffset)**2 + self.mapY**2 < coreRadius**2] = 0
 
+    def getCoreDistanceMap(self):
+        coreRadius = self.normalize(self.props['coreDiameter'].getValue()) / 2
+        coreOffset = self.normalize(self.props['coreOffset'].getValue())
+
+        # Distance to the edge of the offset circle
+        return np.maximum(np.hypot(self.mapX - coreOffset, self.mapY) - coreRadius, 0)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Core: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                              self.props['coreDiameter'].dispFormat(lengthUnit))
@@ -28,25 +28,25 @@ class RodTubeGrain(PerforatedGrain):
 
     def getCorePerimeter(self, regDist):
         if regDist < self.tubeWeb:
-            tubePerimeter = geometry.circlePerimeter(self.props['coreDiameter'].getValue() + (2 * regDist))
+            tubePerimeter = geometry.circlePerimeter(self.params.coreDiameter + (2 * regDist))
         else:
             tubePerimeter = 0
         if regDist < self.rodWeb:
-            rodPerimeter = geometry.circlePerimeter(self.props['rodDiameter'].getValue() - (2 * regDist))
+            rodPerimeter = geometry.circlePerimeter(self.params.rodDiameter - (2 * regDist))
         else:
             rodPerimeter = 0
         return tubePerimeter + rodPerimeter
 
     def getFaceArea(self, regDist):
         if regDist < self.tubeWeb:
-            outer = geometry.circleArea(self.props['diameter'].getValue())
-            inner = geometry.circleArea(self.props['coreDiameter'].getValue() + (2 * regDist))
+            outer = geometry.circleArea(self.params.diameter)
+            inner = geometry.circleArea(self.params.coreDiameter + (2 * regDist))
             tubeArea = outer - inner
         else:
             tubeArea = 0
         if regDist < self.rodWeb:
-            outer = geometry.circleArea(self.props['rodDiameter'].getValue() - (2 * regDist))
-            inner = geometry.circleArea(self.props['supportDiameter'].getValue())
+            outer = geometry.circleArea(self.params.rodDiameter - (2 * regDist))
+            inner = geometry.circleArea(self.params.supportDiameter)
             rodArea = outer - inner
         else:
             rodArea = 0
@@ -31,6 +31,10 @@ class StarGrain(FmmGrain):
             near = comp1*self.mapX - comp0*self.mapY > -0.025
             self.coreMap[np.logical_and(vect, near)] = 0
 
+    def getSymmetryOrder(self):
+        # The first point lies along the Y axis, every point is mirror symmetric about its own axis
+        return max(self.props['numPoints'].getValue(), 1)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Points: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                self.props['numPoints'].getValue())
@@ -21,6 +21,20 @@ class XCore(FmmGrain):
         self.coreMap[np.logical_and(np.abs(self.mapY) < slotWidth/2, np.abs(self.mapX) < slotLength)] = 0
         self.coreMap[np.logical_and(np.abs(self.mapX) < slotWidth/2, np.abs(self.mapY) < slotLength)] = 0
 
+    def getCoreDistanceMap(self):
+        slotWidth = self.normalize(self.props['slotWidth'].getValue())
+        slotLength = self.normalize(self.props['slotLength'].getValue())
+
+        # Distance to the nearer of the two slots
+        horizontal = np.hypot(np.maximum(np.abs(self.mapX) - slotLength, 0),
+                              np.maximum(np.abs(self.mapY) - slotWidth / 2, 0))
+        vertical = np.hypot(np.maximum(np.abs(self.mapX) - slotWidth / 2, 0),
+                            np.maximum(np.abs(self.mapY) - slotLength, 0))
+        return np.minimum(horizontal, vertical)
+
+    def getSymmetryOrder(self):
+        return 4
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Slots: {} by {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                     self.props['slotWidth'].dispFormat(lengthUnit),
@@ -5,9 +5,22 @@ from .propellant import Propellant
 from . import geometry
 from .simResult import SimulationResult, SimAlert, SimAlertLevel, SimAlertType
 from .grains import EndBurningGrain
-from .properties import PropertyCollection, FloatProperty, IntProperty
+from .grain import GeometryCache
+from .properties import PropertyCollection, FloatProperty, IntProperty, BooleanProperty, EnumProperty, makeSnapshot
 from .constants import gasConstant
-from scipy.optimize import newton
+from scipy.optimize import newton, brentq
+import numpy as np
+
+# Number of regression depths that a burn profile tabulates each grain at
+BURN_PROFILE_SAMPLES = 1024
+# How far past each grain's initial web its tables extend, as a fraction of the web, so the timestep that takes the
+# grain past burnout still lands in them
+BURN_PROFILE_MARGIN = 0.05
+# Number of equal intervals the regression domain engine starts from before refining them
+REGRESSION_DOMAIN_INTERVALS = 64
+# How far the pressure halfway through an interval can be from the average of its ends, relative to the pressure,
+# before the interval is split
+REGRESSION_DOMAIN_TOLERANCE = 0.005
 
 class MotorConfig(PropertyCollection):
     """Contains the settings required for simulation, including environmental conditions and details about
@@ -27,6 +40,94 @@ class MotorConfig(PropertyCollection):
         self.props['ambPressure'] = FloatProperty('Ambient Pressure', 'Pa', 0.0001, 102000)
         self.props['mapDim'] = IntProperty('Grain Map Dimension', '', 250, 2000)
         self.props['sepPressureRatio'] = FloatProperty('Separation Pressure Ratio', '', 0.001, 1)
+        self.props['leanGrainMaps'] = BooleanProperty('Release Grain Maps After Setup')
+        self.props['mapSupersample'] = IntProperty('Grain Map Supersampling', '', 1, 8)
+        self.props['singlePrecisionMaps'] = BooleanProperty('Single Precision Grain Maps')
+        self.props['exactCoreDistance'] = BooleanProperty('Exact Distance Regression For Simple Cores')
+        self.props['tabulateGeometry'] = BooleanProperty('Interpolate Grain Geometry From Tables')
+        self.props['simulationEngine'] = EnumProperty('Simulation Engine', ['Time Steps', 'Regression Domain'])
+
+
+class TabulatedGrain():
+    """Stands in for a grain in the geometry calculations of Motor.runSimulation, interpolating its web, volume,
+    surface area and free volume from tables made at a set of regression depths. See BurnProfile."""
+    def __init__(self, depths, webLeft, volume, surfaceArea, freeVolume):
+        self.depths = depths
+        self.webLeft = webLeft
+        self.volume = volume
+        self.surfaceArea = surfaceArea
+        self.freeVolume = freeVolume
+
+    def getWebLeft(self, regDist):
+        return float(np.interp(regDist, self.depths, self.webLeft))
+
+    def isWebLeft(self, regDist, burnoutThres=0.00001):
+        return self.getWebLeft(regDist) > burnoutThres
+
+    def getVolumeAtRegression(self, regDist):
+        return float(np.interp(regDist, self.depths, self.volume))
+
+    def getSurfaceAreaAtRegression(self, regDist):
+        return float(np.interp(regDist, self.depths, self.surfaceArea))
+
+    def getFreeVolume(self, regDist):
+        return float(np.interp(regDist, self.depths, self.freeVolume))
+
+
+class BurnProfile():
+    """The geometry of a motor's grains tabulated against regression depth. Every burning grain regresses by the same
+    distance each timestep, so the geometry is the same for every simulation of the grains no matter the nozzle.
+    Tabulating it once lets each of them interpolate rather than evaluate the grains. Identical grains share their
+    tables. The profile remembers what it was made from, see describes."""
+    def __init__(self, motor, samples=BURN_PROFILE_SAMPLES):
+        self.description = self.describe(motor)
+        self.grains = []
+        twins = motor.getGrainTwins()
+        for gid, grain in enumerate(motor.grains):
+            if twins[gid] != gid:
+                self.grains.append(self.grains[twins[gid]])
+                continue
+            depths = np.linspace(0, grain.getWebLeft(0) * (1 + BURN_PROFILE_MARGIN), samples)
+            tables = np.zeros((4, samples))
+            with GeometryCache() as geometryCache:
+                for index, depth in enumerate(depths):
+                    geometryCache.nextStep()
+                    tables[:, index] = (grain.getWebLeft(depth), grain.getVolumeAtRegression(depth),
+                                        grain.getSurfaceAreaAtRegression(depth), grain.getFreeVolume(depth))
+            self.grains.append(TabulatedGrain(depths, *tables))
+
+    @staticmethod
+    def describe(motor):
+        """Returns what a burn profile of the motor depends on, which is the type, properties and setup of each of
+        its grains."""
+        return [(type(grain), grain.getProperties(), grain.getSetupKey(motor.config)) for grain in motor.grains]
+
+    def describes(self, motor):
+        """Returns True if the profile was made from grains like the motor's, so it can be used to simulate it."""
+        return self.description == self.describe(motor)
+
+
+def averageOverSteps(times, nodeTimes, values):
+    """Returns the average over each step ending at one of 'times' and starting at the one before it, or at 0 for the
+    first, of the piecewise linear function through 'values' at 'nodeTimes'. The node times must be increasing, but a
+    time can be repeated for a jump. Past the last node the function keeps its last value. 'values' can be two
+    dimensional, with a column for each grain."""
+    nodeTimes = np.asarray(nodeTimes, dtype=float)
+    edges = np.concatenate([[0], times])
+    column = (-1,) + (1,) * (values.ndim - 1) # Shape that spreads a value per row over the columns
+
+    # The integral up to each node, then up to each edge from the last node at or before it
+    widths = np.diff(nodeTimes).reshape(column)
+    integral = np.concatenate([np.zeros((1,) + values.shape[1:]),
+                               np.cumsum(widths * (values[1:] + values[:-1]) / 2, axis=0)])
+    before = np.searchsorted(nodeTimes, edges, side='right') - 1
+    after = np.minimum(before + 1, len(nodeTimes) - 1)
+    span = nodeTimes[after] - nodeTimes[before]
+    elapsed = edges - nodeTimes[before]
+    fraction = np.divide(elapsed, span, out=np.zeros_like(elapsed), where=span > 0).reshape(column)
+    edgeValues = values[before] + fraction * (values[after] - values[before])
+    edgeIntegral = integral[before] + elapsed.reshape(column) * (values[before] + edgeValues) / 2
+    return np.diff(edgeIntegral, axis=0) / np.diff(edges).reshape(column)
 
 
 
@@ -40,6 +141,7 @@ class Motor():
         self.propellant = None
         self.nozzle = Nozzle()
         self.config = MotorConfig()
+        self.burnProfile = None
 
         if propDict is not None:
             self.applyDict(propDict)
@@ -48,7 +150,8 @@ class Motor():
         """Returns a serializable representation of the motor. The dictionary has keys 'nozzle', 'propellant',
         'grains', and 'config', which hold to the properties of their corresponding fields. Grains is a list
         of dicts, each containing a type and properties. Propellant may be None if the motor has no propellant
-        set."""
+        set. The config is read with getProperty, so any config object that provides it can be described, and settings
+        it doesn't have are left out."""
         motorData = {}
         motorData['nozzle'] = self.nozzle.getProperties()
         if self.propellant is not None:
@@ -56,7 +159,8 @@ class Motor():
         else:
             motorData['propellant'] = None
         motorData['grains'] = [{'type': grain.geomName, 'properties': grain.getProperties()} for grain in self.grains]
-        motorData['config'] = self.config.getProperties()
+        config = {name: self.config.getProperty(name) for name in MotorConfig().props}
+        motorData['config'] = {name: value for name, value in config.items() if value is not None}
         return motorData
 
     def applyDict(self, dictionary):
@@ -73,16 +177,103 @@ class Motor():
             self.grains[-1].setProperties(entry['properties'])
         self.config.setProperties(dictionary['config'])
 
-    def calcBurningSurfaceArea(self, regDepth):
+    def clone(self, nozzle=None):
+        """Returns a new motor that shares this motor's grains, propellant and config instead of copying them. They
+        are only read while simulating, so clones with different nozzles can be simulated without copying the grains
+        and their maps, and shares its burn profile too. The clone uses the nozzle passed in, or a copy of this
+        motor's nozzle if there is none."""
+        motor = Motor()
+        motor.grains = list(self.grains)
+        motor.propellant = self.propellant
+        motor.config = self.config
+        motor.burnProfile = self.burnProfile
+        if nozzle is None:
+            nozzle = Nozzle()
+            nozzle.setProperties(self.nozzle.getProperties())
+        motor.nozzle = nozzle
+        return motor
+
+    def freezeParameters(self):
+        """Retakes the parameter snapshots of the grains and the nozzle, which their geometry and flow methods read
+        instead of their properties. Called before anything is simulated, so they are taken up front."""
+        for grain in self.grains:
+            grain.freezeParameters()
+        self.nozzle.freezeParameters()
+
+    def getSettings(self):
+        """Returns a snapshot of the simulation settings. They are read with getProperty, so the config can be any
+        object that provides it rather than only a MotorConfig."""
+        return makeSnapshot({name: self.config.getProperty(name) for name in MotorConfig().props})
+
+    def prepareGrains(self, initialOnly=False, faceOnly=False):
+        """Runs the simulation setup of every grain. Grains with the same setup key, like the identical segments of
+        a stacked motor, are only set up once and the others share the result. Lean grains stay set up when pickled,
+        so preparing them before they are sent to other processes saves each process from generating the maps again.
+        If 'initialOnly' is set, the grains only get the initialSetup that getInitialGeometry needs, and if 'faceOnly'
+        is set only the faceSetup that a simulation from a BurnProfile needs."""
+        self.freezeParameters()
+        prepared = []
+        for grain in self.grains:
+            key = grain.getSetupKey(self.config)
+            source = None
+            if key is not None:
+                source = next((other for other, otherKey in prepared if type(other) is type(grain) and otherKey == key),
+                              None)
+            if source is None:
+                if initialOnly:
+                    grain.initialSetup(self.config)
+                elif faceOnly:
+                    grain.faceSetup(self.config)
+                else:
+                    grain.simulationSetup(self.config)
+                prepared.append((grain, key))
+            elif grain is not source:
+                grain.shareSetup(source)
+
+    def getGrainTwins(self):
+        """Returns a list with the index of the first grain in the motor that is identical to each grain, including
+        its length and inhibited ends. Identical grains that have regressed the same distance have the same geometry,
+        so it only has to be evaluated for one of them, see perGrainValues."""
+        descriptions = [(type(grain), grain.getProperties()) for grain in self.grains]
+        return [descriptions.index(description) for description in descriptions]
+
+    def compileBurnProfile(self, samples=BURN_PROFILE_SAMPLES):
+        """Sets the grains up and tabulates their geometry against regression depth in a BurnProfile, which
+        runSimulation interpolates instead of evaluating the grains if the config's 'tabulateGeometry' is set. Clones
+        made afterwards share the profile. It is kept when the motor is pickled, and the grains keep what a simulation
+        from it still reads, so other processes simulate the motor without setting its grains up again, see
+        Grain.faceSetup. Returns the profile."""
+        self.prepareGrains()
+        self.burnProfile = BurnProfile(self, samples)
+        return self.burnProfile
+
+    def perGrainValues(self, func, regDepth, twins=None, grains=None):
+        """Returns a list of func(grain, reg) for every grain and its value in regDepth. If 'twins' from
+        getGrainTwins is passed in, a grain that has regressed as far as the identical grain before it reuses that
+        grain's value instead of calling func again. 'grains' can be a list of stand-ins for the motor's grains to
+        call func with instead, like the tabulated grains of a BurnProfile."""
+        if grains is None:
+            grains = self.grains
+        values = []
+        for gid, (grain, reg) in enumerate(zip(grains, regDepth)):
+            twin = gid if twins is None else twins[gid]
+            if twin != gid and regDepth[twin] == reg:
+                values.append(values[twin])
+            else:
+                values.append(func(grain, reg))
+        return values
+
+    def calcBurningSurfaceArea(self, regDepth, twins=None, grains=None):
         burnoutThres = self.config.getProperty('burnoutWebThres')
-        gWithReg = zip(self.grains, regDepth)
-        perGrain = [gr.getSurfaceAreaAtRegression(reg) * int(gr.isWebLeft(reg, burnoutThres)) for gr, reg in gWithReg]
-        return sum(perGrain)
+        def burningArea(grain, reg):
+            return grain.getSurfaceAreaAtRegression(reg) * int(grain.isWebLeft(reg, burnoutThres))
+        return sum(self.perGrainValues(burningArea, regDepth, twins, grains))
 
-    def calcKN(self, regDepth, dThroat):
+    def calcKN(self, regDepth, dThroat, twins=None, grains=None):
         """Returns the motor's Kn when it has each grain has regressed by its value in regDepth, which should be a list
-        with the same number of elements as there are grains in the motor."""
-        burningSurfaceArea = self.calcBurningSurfaceArea(regDepth)
+        with the same number of elements as there are grains in the motor. 'twins' can be passed in to skip evaluating
+        identical grains more than once and 'grains' to use stand-ins for the grains, see perGrainValues."""
+        burningSurfaceArea = self.calcBurningSurfaceArea(regDepth, twins, grains)
         nozzleArea = self.nozzle.getThroatArea(dThroat)
         return burningSurfaceArea / nozzleArea
 
@@ -102,9 +293,9 @@ class Motor():
         thrust = thrustCoeff * self.nozzle.getThroatArea(dThroat) * chamberPres
         return max(thrust, 0)
 
-    def calcFreeVolume(self, regDepth):
+    def calcFreeVolume(self, regDepth, twins=None, grains=None):
         """Calculates the volume inside of the motor not occupied by proppellant for a set of regression depths."""
-        return sum([grain.getFreeVolume(reg) for grain, reg in zip(self.grains, regDepth)])
+        return sum(self.perGrainValues(lambda grain, reg: grain.getFreeVolume(reg), regDepth, twins, grains))
 
     def calcTotalVolume(self):
         """Calculates the bounding-cylinder volume of the combustion chamber."""
@@ -136,6 +327,148 @@ class Motor():
             M = 0.0
         return max(M, 0)
 
+    def integrateRegressionDomain(self, simRes, settings, grains=None, twins=None, callback=None):
+        """Simulates the burn by integrating over regression depth instead of time, which is possible when the throat
+        doesn't change as the state of the motor then only depends on how far the grains have regressed. Every grain
+        that is burning regresses the same distance, so the time taken to regress from one depth to the next is that
+        distance over the burn rate at the pressure halfway. The depths start evenly spaced and intervals are split
+        where the pressure curves, and the depth at which each grain burns out is one of them, so the tail-off is
+        resolved with few evaluations. The burn stops where the thrust drops below the threshold, like with time
+        steps. The results are resampled onto the config's timestep, with the force and mass flow averaged over each
+        step, and added to the channels of 'simRes' after its values at ignition. 'grains' and 'twins' are used as in
+        perGrainValues. Returns True if the callback cancelled the simulation."""
+        if grains is None:
+            grains = self.grains
+        density = self.propellant.getProperty('density')
+        burnoutWebThres = settings.burnoutWebThres
+        throatArea = self.nozzle.getThroatArea()
+        motorVolume = self.calcTotalVolume()
+
+        # The depth at which each grain's web drops to the burnout threshold and it stops regressing
+        stops = []
+        for grain in grains:
+            initialWeb = grain.getWebLeft(0)
+            if initialWeb <= burnoutWebThres:
+                stops.append(0)
+            else:
+                # The web can shrink slower than the grain regresses, so look further out until it has burned out
+                outside = initialWeb
+                while grain.getWebLeft(outside) > burnoutWebThres:
+                    outside *= 2
+                stops.append(brentq(lambda reg, grain=grain: grain.getWebLeft(reg) - burnoutWebThres, 0, outside))
+        end = max(stops)
+
+        burningPressures = {}
+        def burningPressure(depth, burning):
+            key = (depth, tuple(burning))
+            if key not in burningPressures:
+                area = self.perGrainValues(lambda grain, reg: max(grain.getSurfaceAreaAtRegression(reg), 0),
+                                           [min(depth, grainStop) for grainStop in stops], twins, grains)
+                area = sum(grainArea for grainArea, isBurning in zip(area, burning) if isBurning)
+                burningPressures[key] = self.propellant.getPressureFromKn(area / throatArea)
+            return burningPressures[key]
+
+        def channelValues(depth, active):
+            """Returns the value of each channel when the grains have regressed to 'depth' and the ones marked in
+            'active' are burning. Flows are those over a timestep ending at 'depth', as the timestep engine reports."""
+            perGrainReg = [min(depth, grainStop) for grainStop in stops]
+            # Fitted geometry can dip below zero just before a grain burns out
+            area = self.perGrainValues(lambda grain, reg: max(grain.getSurfaceAreaAtRegression(reg), 0), perGrainReg,
+                                       twins, grains)
+            kn = sum(grainArea for grainArea, isBurning in zip(area, active) if isBurning) / throatArea
+            chamberPressure = self.propellant.getPressureFromKn(kn)
+            _, _, gamma, _, _ = self.propellant.getCombustionProperties(chamberPressure)
+            exitPressure = self.nozzle.getExitPressure(gamma, chamberPressure)
+            dReg = self.propellant.getBurnRate(chamberPressure) * settings.timestep
+
+            massFlow = 0
+            perGrainMassFlow = [0 for grain in self.grains]
+            perGrainMassFlux = [0 for grain in self.grains]
+            for gid, grain in enumerate(self.grains):
+                if active[gid]:
+                    reg = max(perGrainReg[gid] - dReg, 0)
+                    perGrainMassFlux[gid] = grain.getPeakMassFlux(massFlow, settings.timestep, reg, dReg, density)
+                    massFlow += area[gid] * dReg * density / settings.timestep
+                perGrainMassFlow[gid] = massFlow
+
+            volume = self.perGrainValues(lambda grain, reg: grain.getVolumeAtRegression(reg), perGrainReg, twins,
+                                         grains)
+            webLeft = self.perGrainValues(lambda grain, reg: grain.getWebLeft(reg), perGrainReg, twins, grains)
+            freeVolume = self.calcFreeVolume(perGrainReg, twins, grains)
+            return {
+                'kn': kn,
+                'pressure': chamberPressure,
+                'force': self.calcForce(chamberPressure, 0, exitPressure),
+                'mass': [grainVolume * density for grainVolume in volume],
+                'volumeLoading': 100 * (1 - (freeVolume / motorVolume)),
+                'massFlow': perGrainMassFlow,
+                'massFlux': perGrainMassFlux,
+                'regression': perGrainReg,
+                'web': [web if active[gid] else 0 for gid, web in enumerate(webLeft)],
+                'exitPressure': exitPressure,
+                'machNumber': [self.calcMachNumber(chamberPressure, flux) for flux in perGrainMassFlux],
+            }
+
+        # Go through intervals that no grain burns out in and that the pressure is close to linear over in order of
+        # depth, evaluating the channels at the end of each, so the burn stops as soon as the thrust drops below the
+        # threshold as it does with time steps. A nozzle that never makes thrust is done after its first interval.
+        # Intervals aren't split below the distance a timestep regresses, which the timestep engine resolves. Where
+        # grains burn out there is a second set of values at the same time, so the drop isn't spread over an interval.
+        depths = sorted(set(stops) | set(np.linspace(0, end, REGRESSION_DOMAIN_INTERVALS + 1)))
+        pending = list(zip(depths[:-1], depths[1:]))[::-1]
+        nodeTimes = [0]
+        nodes = [channelValues(0, [grainStop > 0 for grainStop in stops])]
+        peakForce = 0
+        while pending:
+            start, stop = pending.pop()
+            middle = (start + stop) / 2
+            burning = [grainStop > middle for grainStop in stops]
+            pressures = [burningPressure(depth, burning) for depth in (start, middle, stop)]
+            curvature = abs(pressures[1] - ((pressures[0] + pressures[2]) / 2))
+            splittable = stop - start > 2 * self.propellant.getBurnRate(pressures[1]) * settings.timestep
+            if curvature > REGRESSION_DOMAIN_TOLERANCE * pressures[1] and splittable:
+                pending += [(middle, stop), (start, middle)]
+                continue
+            if pressures[1] <= 0: # Nothing is burning, so the motor stops here
+                break
+
+            nodeTimes.append(nodeTimes[-1] + ((stop - start) / self.propellant.getBurnRate(pressures[1])))
+            nodes.append(channelValues(stop, burning))
+            peakForce = max(peakForce, nodes[-1]['force'])
+            # No grain burns out inside an interval, so the ones still burning after it are those that stop later
+            following = [grainStop > stop for grainStop in stops]
+            if following != burning:
+                nodeTimes.append(nodeTimes[-1])
+                nodes.append(channelValues(stop, following))
+
+            if callback is not None and callback(stop / end): # If the callback returns true, it is time to cancel
+                return True
+            if nodes[-1]['force'] <= settings.burnoutThrustThres * 0.01 * peakForce:
+                break
+
+        # Resample onto the timestep. The force and mass flow of each timestep are their averages over it rather than
+        # their values at its end, so that the impulse and propellant flow summed over the timesteps are those of the
+        # nodes. Everything else is interpolated at the end of each timestep, as the timestep engine reports it.
+        times = np.arange(1, int(np.ceil(nodeTimes[-1] / settings.timestep)) + 1) * settings.timestep
+        samples = {}
+        for name in nodes[0]:
+            values = np.array([node[name] for node in nodes], dtype=float)
+            if name in ('force', 'massFlow'):
+                samples[name] = averageOverSteps(times, nodeTimes, values).tolist()
+            elif values.ndim == 1:
+                samples[name] = np.interp(times, nodeTimes, values).tolist()
+            else:
+                columns = [np.interp(times, nodeTimes, values[:, gid]) for gid in range(values.shape[1])]
+                samples[name] = np.column_stack(columns).tolist()
+        for index, time in enumerate(times):
+            simRes.channels['time'].addData(float(time))
+            simRes.channels['dThroat'].addData(0)
+            for name, values in samples.items():
+                simRes.channels[name].addData(values[index])
+            if not simRes.shouldContinueSim(settings.burnoutThrustThres):
+                break
+        return False
+
     def runSimulation(self, callback=None):
         """Runs a simulation of the motor and returns a simRes instance with the results. Constraints are checked,
         including the number of grains, if the motor has a propellant set, and if the grains have geometry errors. If
@@ -144,9 +477,11 @@ class Motor():
         using the pressure to determine how the motor will regress in the given timestep at the current pressure.
         This process is repeated and regression tracked until all grains have burned out, when the results and any
         warnings are returned."""
-        burnoutWebThres = self.config.getProperty('burnoutWebThres')
-        burnoutThrustThres = self.config.getProperty('burnoutThrustThres')
-        dTime = self.config.getProperty('timestep')
+        self.freezeParameters()
+        settings = self.getSettings()
+        burnoutWebThres = settings.burnoutWebThres
+        burnoutThrustThres = settings.burnoutThrustThres
+        dTime = settings.timestep
 
         simRes = SimulationResult(self)
 
@@ -182,126 +517,157 @@ class Motor():
         # Precalculate these are they don't change
         motorVolume = self.calcTotalVolume()
 
-        # Generate coremaps for perforated grains
-        for grain in self.grains:
-            grain.simulationSetup(self.config)
-
-        # Setup initial values
-        perGrainReg = [0 for grain in self.grains]
-
-        # At t = 0, the motor has ignited
-        simRes.channels['time'].addData(0)
-        simRes.channels['kn'].addData(self.calcKN(perGrainReg, 0))
-        simRes.channels['pressure'].addData(self.calcIdealPressure(perGrainReg, 0, None))
-        simRes.channels['force'].addData(0)
-        simRes.channels['mass'].addData([grain.getVolumeAtRegression(0) * density for grain in self.grains])
-        simRes.channels['volumeLoading'].addData(100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume)))
-        simRes.channels['massFlow'].addData([0 for grain in self.grains])
-        simRes.channels['massFlux'].addData([0 for grain in self.grains])
-        simRes.channels['regression'].addData([0 for grains in self.grains])
-        simRes.channels['web'].addData([grain.getWebLeft(0) for grain in self.grains])
-        simRes.channels['exitPressure'].addData(0)
-        simRes.channels['dThroat'].addData(0)
-        simRes.channels['machNumber'].addData([0 for grain in self.grains])
-
-        # Check port/throat ratio and add a warning if it is not large enough
-        aftPort = self.grains[-1].getPortArea(0)
-        if aftPort is not None:
-            minAllowed = self.config.getProperty('minPortThroat')
-            ratio = aftPort / geometry.circleArea(self.nozzle.props['throat'].getValue())
-            if ratio < minAllowed:
-                description = 'Initial port/throat ratio of {:.3f} was less than {:.3f}'.format(ratio, minAllowed)
-                simRes.addAlert(SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, description, 'N/A'))
-
-        # Perform timesteps
-        while simRes.shouldContinueSim(burnoutThrustThres):
-            # Calculate regression
-            massFlow = 0
-            perGrainMass = [0 for grain in self.grains]
-            perGrainMassFlow = [0 for grain in self.grains]
-            perGrainMassFlux = [0 for grain in self.grains]
-            perGrainWeb = [0 for grain in self.grains]
-            for gid, grain in enumerate(self.grains):
-                if grain.getWebLeft(perGrainReg[gid]) > burnoutWebThres:
-                    # Calculate regression at the current pressure
-                    reg = dTime * self.propellant.getBurnRate(simRes.channels['pressure'].getLast())
-                    # Find the mass flux through the grain based on the mass flow fed into from grains above it
-                    perGrainMassFlux[gid] = grain.getPeakMassFlux(massFlow, dTime, perGrainReg[gid], reg, density)
-                    # Find the mass of the grain after regression
-                    perGrainMass[gid] = grain.getVolumeAtRegression(perGrainReg[gid]) * density
-                    # Add the change in grain mass to the mass flow
-                    massFlow += (simRes.channels['mass'].getLast()[gid] - perGrainMass[gid]) / dTime
-                    # Apply the regression
-                    perGrainReg[gid] += reg
-                    perGrainWeb[gid] = grain.getWebLeft(perGrainReg[gid])
-                perGrainMassFlow[gid] = massFlow
-            simRes.channels['regression'].addData(perGrainReg[:])
-            simRes.channels['web'].addData(perGrainWeb)
-
-            simRes.channels['volumeLoading'].addData(100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume)))
-            simRes.channels['mass'].addData(perGrainMass)
-            simRes.channels['massFlow'].addData(perGrainMassFlow)
-            simRes.channels['massFlux'].addData(perGrainMassFlux)
-
-            # Calculate KN
-            dThroat = simRes.channels['dThroat'].getLast()
-            simRes.channels['kn'].addData(self.calcKN(perGrainReg, dThroat))
-
-            # Calculate Pressure
-            lastKn = simRes.channels['kn'].getLast()
-            pressure = self.calcIdealPressure(perGrainReg, dThroat, lastKn)
-            simRes.channels['pressure'].addData(pressure)
-
-            # Calculate Mach Number
-            perGrainMachNumber = [0 for grain in self.grains]
-            for gid, grain in enumerate(self.grains):
-                perGrainMachNumber[gid] = self.calcMachNumber(pressure, perGrainMassFlux[gid])
-            simRes.channels['machNumber'].addData(perGrainMachNumber)
-
-            # Calculate Exit Pressure
-            _, _, gamma, _, _ = self.propellant.getCombustionProperties(pressure)
-            exitPressure = self.nozzle.getExitPressure(gamma, pressure)
-            simRes.channels['exitPressure'].addData(exitPressure)
-
-            # Calculate force
-            force = self.calcForce(simRes.channels['pressure'].getLast(), dThroat, exitPressure)
-            simRes.channels['force'].addData(force)
-
-            simRes.channels['time'].addData(simRes.channels['time'].getLast() + dTime)
-
-            # Calculate any slag deposition or erosion of the throat
-            if pressure == 0:
-                slagRate = 0
+        # The web, volume and surface area of the grains come from their burn profile if the config asks for it. The
+        # grains are then only asked for their face and port areas, so they aren't set up again if they kept those.
+        geometryGrains = None
+        if settings.tabulateGeometry:
+            if self.burnProfile is not None and self.burnProfile.describes(self):
+                self.prepareGrains(faceOnly=True)
             else:
-                slagRate = (1 / pressure) * self.nozzle.getProperty('slagCoeff')
-            erosionRate = pressure * self.nozzle.getProperty('erosionCoeff')
-            change = dTime * ((-2 * slagRate) + (2 * erosionRate))
-            simRes.channels['dThroat'].addData(dThroat + change)
-
-            if callback is not None:
-                # Uses the grain with the largest percentage of its web left
-                progress = max([g.getWebLeft(r) / g.getWebLeft(0) for g, r in zip(self.grains, perGrainReg)])
-                if callback(1 - progress): # If the callback returns true, it is time to cancel
+                self.compileBurnProfile()
+            geometryGrains = self.burnProfile.grains
+        else:
+            # Generate coremaps for perforated grains
+            self.prepareGrains()
+        twins = self.getGrainTwins()
+
+        # Geometry is calculated once per grain and regression depth, see GeometryCache
+        with GeometryCache() as geometryCache:
+            # Setup initial values
+            perGrainReg = [0 for grain in self.grains]
+
+            # At t = 0, the motor has ignited
+            simRes.channels['time'].addData(0)
+            simRes.channels['kn'].addData(self.calcKN(perGrainReg, 0, twins, geometryGrains))
+            simRes.channels['pressure'].addData(self.calcIdealPressure(perGrainReg, 0, simRes.channels['kn'].getLast()))
+            simRes.channels['force'].addData(0)
+            simRes.channels['mass'].addData([grain.getVolumeAtRegression(0) * density for grain in self.grains])
+            simRes.channels['volumeLoading'].addData(100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume)))
+            simRes.channels['massFlow'].addData([0 for grain in self.grains])
+            simRes.channels['massFlux'].addData([0 for grain in self.grains])
+            simRes.channels['regression'].addData([0 for grains in self.grains])
+            simRes.channels['web'].addData([grain.getWebLeft(0) for grain in self.grains])
+            simRes.channels['exitPressure'].addData(0)
+            simRes.channels['dThroat'].addData(0)
+            simRes.channels['machNumber'].addData([0 for grain in self.grains])
+
+            # Check port/throat ratio and add a warning if it is not large enough
+            aftPort = self.grains[-1].getPortArea(0)
+            simRes.aftPortArea = aftPort
+            if aftPort is not None:
+                minAllowed = settings.minPortThroat
+                ratio = aftPort / geometry.circleArea(self.nozzle.params.throat)
+                if ratio < minAllowed:
+                    description = 'Initial port/throat ratio of {:.3f} was less than {:.3f}'.format(ratio, minAllowed)
+                    simRes.addAlert(SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, description, 'N/A'))
+
+            # Without throat erosion or slag the burn can be integrated over regression depth, which leaves nothing for
+            # the timesteps below to do
+            fixedThroat = self.nozzle.params.erosionCoeff == 0 and self.nozzle.params.slagCoeff == 0
+            regressionDomain = settings.simulationEngine == 'Regression Domain' and fixedThroat
+            if regressionDomain:
+                if self.integrateRegressionDomain(simRes, settings, geometryGrains, twins, callback):
                     return simRes
 
+            # Perform timesteps
+            while not regressionDomain and simRes.shouldContinueSim(burnoutThrustThres):
+                geometryCache.nextStep()
+                # Calculate regression
+                massFlow = 0
+                perGrainMass = [0 for grain in self.grains]
+                perGrainMassFlow = [0 for grain in self.grains]
+                perGrainMassFlux = [0 for grain in self.grains]
+                # Identical grains at the same regression share these, only the mass flux depends on their position
+                webLeft = self.perGrainValues(lambda grain, reg: grain.getWebLeft(reg), perGrainReg, twins,
+                                              geometryGrains)
+                burning = [web > burnoutWebThres for web in webLeft]
+                volume = self.perGrainValues(lambda grain, reg: grain.getVolumeAtRegression(reg), perGrainReg, twins,
+                                             geometryGrains)
+                for gid, grain in enumerate(self.grains):
+                    if burning[gid]:
+                        # Calculate regression at the current pressure
+                        reg = dTime * self.propellant.getBurnRate(simRes.channels['pressure'].getLast())
+                        # Find the mass flux through the grain based on the mass flow fed into from grains above it
+                        perGrainMassFlux[gid] = grain.getPeakMassFlux(massFlow, dTime, perGrainReg[gid], reg, density)
+                        # Find the mass of the grain after regression
+                        perGrainMass[gid] = volume[gid] * density
+                        # Add the change in grain mass to the mass flow
+                        massFlow += (simRes.channels['mass'].getLast()[gid] - perGrainMass[gid]) / dTime
+                        # Apply the regression
+                        perGrainReg[gid] += reg
+                    perGrainMassFlow[gid] = massFlow
+                webLeft = self.perGrainValues(lambda grain, reg: grain.getWebLeft(reg), perGrainReg, twins,
+                                              geometryGrains)
+                perGrainWeb = [web if burning[gid] else 0 for gid, web in enumerate(webLeft)]
+                simRes.channels['regression'].addData(perGrainReg[:])
+                simRes.channels['web'].addData(perGrainWeb)
+
+                freeVolume = self.calcFreeVolume(perGrainReg, twins, geometryGrains)
+                simRes.channels['volumeLoading'].addData(100 * (1 - (freeVolume / motorVolume)))
+                simRes.channels['mass'].addData(perGrainMass)
+                simRes.channels['massFlow'].addData(perGrainMassFlow)
+                simRes.channels['massFlux'].addData(perGrainMassFlux)
+
+                # Calculate KN
+                dThroat = simRes.channels['dThroat'].getLast()
+                simRes.channels['kn'].addData(self.calcKN(perGrainReg, dThroat, twins, geometryGrains))
+
+                # Calculate Pressure
+                lastKn = simRes.channels['kn'].getLast()
+                pressure = self.calcIdealPressure(perGrainReg, dThroat, lastKn)
+                simRes.channels['pressure'].addData(pressure)
+
+                # Calculate Mach Number
+                perGrainMachNumber = [0 for grain in self.grains]
+                for gid, grain in enumerate(self.grains):
+                    perGrainMachNumber[gid] = self.calcMachNumber(pressure, perGrainMassFlux[gid])
+                simRes.channels['machNumber'].addData(perGrainMachNumber)
+
+                # Calculate Exit Pressure
+                _, _, gamma, _, _ = self.propellant.getCombustionProperties(pressure)
+                exitPressure = self.nozzle.getExitPressure(gamma, pressure)
+                simRes.channels['exitPressure'].addData(exitPressure)
+
+                # Calculate force
+                force = self.calcForce(simRes.channels['pressure'].getLast(), dThroat, exitPressure)
+                simRes.channels['force'].addData(force)
+
+                simRes.channels['time'].addData(simRes.channels['time'].getLast() + dTime)
+
+                # Calculate any slag deposition or erosion of the throat
+                if pressure == 0:
+                    slagRate = 0
+                else:
+                    slagRate = (1 / pressure) * self.nozzle.params.slagCoeff
+                erosionRate = pressure * self.nozzle.params.erosionCoeff
+                change = dTime * ((-2 * slagRate) + (2 * erosionRate))
+                simRes.channels['dThroat'].addData(dThroat + change)
+
+                if callback is not None:
+                    # Uses the grain with the largest percentage of its web left
+                    progress = max([g.getWebLeft(r) / g.getWebLeft(0) for g, r in zip(self.grains, perGrainReg)])
+                    if callback(1 - progress): # If the callback returns true, it is time to cancel
+                        return simRes
+
         simRes.success = True
 
-        if simRes.getPeakMassFlux() > self.config.getProperty('maxMassFlux'):
+        if simRes.getPeakMassFlux() > settings.maxMassFlux:
             desc = 'Peak mass flux exceeded configured limit'
             alert = SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, desc, 'Motor')
             simRes.addAlert(alert)
 
-        if simRes.getMaxPressure() > self.config.getProperty('maxPressure'):
+        if simRes.getMaxPressure() > settings.maxPressure:
             desc = 'Max pressure exceeded configured limit'
             alert = SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, desc, 'Motor')
             simRes.addAlert(alert)
 
-        if simRes.getPeakMachNumber() > self.config.getProperty('maxMachNumber'):
+        if simRes.getPeakMachNumber() > settings.maxMachNumber:
             desc = 'Max core Mach number exceeded configured limit'
             alert = SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, desc, 'Motor')
             simRes.addAlert(alert)
 
-        if (simRes.getPercentBelowThreshold('exitPressure', self.config.getProperty('ambPressure') * self.config.getProperty('sepPressureRatio')) > self.config.getProperty('flowSeparationWarnPercent')):
+        separationPressure = settings.ambPressure * settings.sepPressureRatio
+        if simRes.getPercentBelowThreshold('exitPressure', separationPressure) > settings.flowSeparationWarnPercent:
             desc = 'Low exit pressure, nozzle flow may separate'
             alert = SimAlert(SimAlertLevel.WARNING, SimAlertType.VALUE, desc, 'Nozzle')
             simRes.addAlert(alert)
@@ -333,6 +699,7 @@ class Motor():
 
         simRes = SimulationResult(self)
 
+        self.freezeParameters()
         density = self.propellant.getProperty('density') if self.propellant is not None else None
         throatArea = self.nozzle.getThroatArea()
         motorVolume = self.calcTotalVolume()
@@ -340,22 +707,22 @@ class Motor():
         if motorVolume == 0:
             return results
 
-        # Generate coremaps for perforated grains
         for grain in self.grains:
             for alert in grain.getGeometryErrors():
                 if alert.level == SimAlertLevel.ERROR:
                     return results
 
-            grain.simulationSetup(self.config)
-
-        perGrainReg = [0 for grain in self.grains]
+        # Only the geometry before any regression is needed, which grains can get without a full simulation setup
+        self.prepareGrains(initialOnly=True)
+        surfaceAreas, volumes, portAreas = zip(*[grain.getInitialGeometry() for grain in self.grains])
 
-        results['volumeLoading'] = 100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume))
+        results['volumeLoading'] = 100 * (sum(volumes) / motorVolume)
+        simRes.aftPortArea = portAreas[-1]
         if throatArea != 0:
-            results['initialKn'] = self.calcKN(perGrainReg, 0)
+            results['initialKn'] = sum(surfaceAreas) / throatArea
             results['portRatio'] = simRes.getPortRatio()
         if density is not None:
-            results['propellantMass'] = sum([grain.getVolumeAtRegression(0) * density for grain in self.grains])
+            results['propellantMass'] = sum(volumes) * density
         results['length'] = simRes.getPropellantLength()
 
         return results
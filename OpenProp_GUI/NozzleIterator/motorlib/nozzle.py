@@ -31,16 +31,16 @@ class Nozzle(PropertyCollection):
 
     def calcExpansion(self):
         """Returns the nozzle's expansion ratio."""
-        return (self.props['exit'].getValue() / self.props['throat'].getValue()) ** 2
+        return (self.params.exit / self.params.throat) ** 2
 
     def getThroatArea(self, dThroat=0):
         """Returns the area of the nozzle's throat. The optional parameter is added on to the nozzle throat diameter
         allow erosion or slag buildup during a burn."""
-        return geometry.circleArea(self.props['throat'].getValue() + dThroat)
+        return geometry.circleArea(self.params.throat + dThroat)
 
     def getExitArea(self):
         """Return the area of the nozzle's exit."""
-        return geometry.circleArea(self.props['exit'].getValue())
+        return geometry.circleArea(self.params.exit)
 
     def getExitPressure(self, k, inputPressure):
         """Solves for the nozzle's exit pressure, given an input pressure and the gas's specific heat ratio."""
@@ -48,13 +48,13 @@ class Nozzle(PropertyCollection):
 
     def getDivergenceLosses(self):
         """Returns nozzle efficiency losses due to divergence angle"""
-        divAngleRad = math.radians(self.props["divAngle"].getValue())
+        divAngleRad = math.radians(self.params.divAngle)
         return (1 + math.cos(divAngleRad)) / 2
 
     def getThroatLosses(self, dThroat=0):
         """Returns the losses caused by the throat aspect ratio as described in this document:
         http://rasaero.com/dloads/Departures%20from%20Ideal%20Performance.pdf"""
-        throatAspect = self.props['throatLength'].getValue() / (self.props['throat'].getValue() + dThroat)
+        throatAspect = self.params.throatLength / (self.params.throat + dThroat)
         if throatAspect > 0.45:
             return 0.95
         return 0.99 - (0.0333 * throatAspect)
@@ -97,7 +97,7 @@ class Nozzle(PropertyCollection):
         divLoss = self.getDivergenceLosses()
         throatLoss = self.getThroatLosses(dThroat)
         skinLoss = self.getSkinLosses()
-        efficiency = self.getProperty('efficiency')
+        efficiency = self.params.efficiency
         return divLoss * throatLoss * efficiency * (skinLoss * thrustCoeffIdeal + (1 - skinLoss))
 
     def getGeometryErrors(self):
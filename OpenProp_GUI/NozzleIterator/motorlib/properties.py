@@ -2,25 +2,42 @@
 them, such as allowed ranges. They also can optionally associate a unit with the value, which aids with display and
 conversion of the value."""
 
+import functools
+
 from . import units
 
 class Property():
     """The base class that properties inherit from. It associates a human-readable display name with the data, as well
-    as a unit and value type that it casts all inputs to."""
+    as a unit and value type that it casts all inputs to. Properties are slotted, as every grain, nozzle and config
+    holds a number of them."""
+    __slots__ = ('dispName', 'unit', 'valueType', 'value', 'owner')
     def __init__(self, dispName, unit, valueType):
         self.dispName = dispName
         self.unit = unit
         self.valueType = valueType
         self.value = None
+        self.owner = None
 
     def setValue(self, value):
         """Set the value of the property, casting if necessary"""
         self.value = self.valueType(value)
+        self.valueChanged()
+
+    def valueChanged(self):
+        """Drops the parameter snapshot of the collection that owns the property, so that it is retaken with the new
+        value the next time it is read. The owner is set by the collection when it takes the snapshot."""
+        if self.owner is not None:
+            self.owner.__dict__.pop('params', None)
 
     def getValue(self):
         """Returns the value of the property"""
         return self.value
 
+    def restoreValue(self, value):
+        """Sets a value that came from getValue of an identical property, without the checks and casting of
+        setValue. Used to rebuild pickled property collections."""
+        self.value = value
+
     def dispFormat(self, unit):
         """Returns a human-readable version of the property's current value, including the unit."""
         return '{} {}'.format(self.value, unit)
@@ -28,6 +45,7 @@ class Property():
 
 class FloatProperty(Property):
     """A property that handles floats. It forces the value to be in a certain range."""
+    __slots__ = ('min', 'max')
     def __init__(self, dispName, unit, minValue, maxValue):
         super().__init__(dispName, unit, float)
         self.min = minValue
@@ -45,6 +63,7 @@ class FloatProperty(Property):
 class EnumProperty(Property):
     """This property operates on strings, but only allows values from a list that is set when the property is
     defined"""
+    __slots__ = ('values',)
     def __init__(self, dispName, values):
         super().__init__(dispName, '', object)
         self.values = values
@@ -57,10 +76,12 @@ class EnumProperty(Property):
     def setValue(self, value):
         if self.contains(value):
             self.value = value
+            self.valueChanged()
 
 
 class IntProperty(Property):
     """A property with an integer as the value that is clamped to a certain range."""
+    __slots__ = ('min', 'max')
     def __init__(self, dispName, unit, minValue, maxValue):
         super().__init__(dispName, unit, int)
         self.min = minValue
@@ -74,18 +95,21 @@ class IntProperty(Property):
 
 class StringProperty(Property):
     """A property that works on the set of all strings"""
+    __slots__ = ()
     def __init__(self, dispName):
         super().__init__(dispName, '', str)
 
 
 class BooleanProperty(Property):
     """A property with a single boolean as the value"""
+    __slots__ = ()
     def __init__(self, dispName):
         super().__init__(dispName, '', bool)
 
 
 class PolygonProperty(Property):
     """A property that contains a list of polygons, each a list of points"""
+    __slots__ = ()
     def __init__(self, dispName):
         super().__init__(dispName, '', list)
         self.value = []
@@ -93,6 +117,7 @@ class PolygonProperty(Property):
 
 class TabularProperty(Property):
     """A property that is composed of a number of 'tabs', each of which is a property collection of its own."""
+    __slots__ = ('collection', 'tabs')
     def __init__(self, dispName, collection):
         super().__init__(dispName, '', list)
         self.collection = collection
@@ -107,13 +132,90 @@ class TabularProperty(Property):
 
     def setValue(self, value):
         self.tabs = [self.collection(data) for data in value]
+        self.valueChanged()
+
+    def restoreValue(self, value):
+        self.setValue(value)
+
+
+# The slotted snapshot class made for each set of property names, see makeSnapshot
+snapshotClasses = {}
+
+class ParameterSnapshot():
+    """A read only record of the values of a property collection at one point in time. Every value is stored in a
+    slot, so reading one is a plain attribute access rather than a dictionary lookup and a call to getValue, which adds
+    up in methods that the simulation calls many times per timestep. Use makeSnapshot to create one."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Parameter snapshots are read only')
+
+    def __delattr__(self, name):
+        raise AttributeError('Parameter snapshots are read only')
+
+    def __reduce__(self):
+        return makeSnapshot, ({name: getattr(self, name) for name in self.__slots__},)
+
+    def __repr__(self):
+        values = ', '.join('{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__)
+        return 'ParameterSnapshot({})'.format(values)
+
+def makeSnapshot(values):
+    """Returns a ParameterSnapshot holding the values in the dictionary 'values' as attributes of the same names."""
+    names = tuple(values.keys())
+    snapshotClass = snapshotClasses.get(names)
+    if snapshotClass is None:
+        snapshotClass = type('ParameterSnapshot', (ParameterSnapshot,), {'__slots__': names})
+        snapshotClasses[names] = snapshotClass
+    snapshot = snapshotClass()
+    for name, value in values.items():
+        object.__setattr__(snapshot, name, value)
+    return snapshot
 
 
 class PropertyCollection():
-    """Holds a set of properties and allows batch operations on them through dictionaries"""
+    """Holds a set of properties and allows batch operations on them through dictionaries. When pickled or copied, only
+    the values of the properties are kept and the properties themselves are rebuilt from a new instance of the class,
+    so the names, units and limits of every property aren't sent along with each grain or nozzle."""
     def __init__(self):
         self.props = {}
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The snapshot is retaken from the values when it is next read, as the rebuilt properties have no owner yet
+        state.pop('params', None)
+        state['props'] = {name: prop.getValue() for name, prop in self.props.items()}
+        return state
+
+    def __setstate__(self, state):
+        values = state.pop('props')
+        self.__dict__.update(state)
+        self.props = type(self)().props
+        for name, value in values.items():
+            self.props[name].restoreValue(value)
+
+    @functools.cached_property
+    def params(self):
+        """A snapshot of the values of the properties, from getSnapshot. It is taken the first time it is read and
+        dropped whenever one of the properties is set, whether through the collection or directly through self.props,
+        so the next read retakes it. freezeParameters retakes it right away."""
+        return self.takeSnapshot()
+
+    def takeSnapshot(self):
+        """Returns a snapshot for self.params, marking this collection as the owner of its properties so that setting
+        any of them drops it."""
+        for prop in self.props.values():
+            prop.owner = self
+        return self.getSnapshot()
+
+    def getSnapshot(self):
+        """Returns a ParameterSnapshot of the current values of the properties."""
+        return makeSnapshot(self.getProperties())
+
+    def freezeParameters(self):
+        """Retakes the snapshot in self.params from the current values of the properties."""
+        self.params = self.takeSnapshot()
+
     def setProperties(self, props):
         """Sets the value(s) of one of more properties at a time by passing in a dictionary of property names and
         values"""
@@ -2,6 +2,7 @@
 the channels and components that it is comprised of."""
 
 import math
+from array import array
 from enum import Enum
 
 from . import geometry
@@ -38,17 +39,22 @@ class SimAlert():
     (other information). The type describes the variety of issue the alert is associated with, and the description is
     a human-readable version string with more details about the problem. The location can either be None or a string to
     help the user find the problem."""
+    __slots__ = ('level', 'type', 'description', 'location')
     def __init__(self, level, alertType, description, location=None):
         self.level = level
         self.type = alertType
         self.description = description
         self.location = location
 
+    def __reduce__(self):
+        return SimAlert, (self.level, self.type, self.description, self.location)
+
 
 class LogChannel():
     """A log channel accepts data from a single source throughout a simulation. It has a human-readable name such as
     'Pressure' to help the user interpret the result, a value type that data passed in will be cast to, and a unit to
     aid in conversion and display. The data type can either be a scalar (float or int) or a list (list or tuple)."""
+    __slots__ = ('name', 'unit', 'valueType', 'data')
     def __init__(self, name, valueType, unit):
         if valueType not in (int, float, list, tuple):
             raise TypeError('Value type not in allowed set')
@@ -57,6 +63,20 @@ class LogChannel():
         self.valueType = valueType
         self.data = []
 
+    def __reduce__(self):
+        """Pickles float data as packed doubles rather than a list of float objects, which is both smaller and much
+        faster to pickle. List channels are flattened into one array if all of their datapoints have the same length,
+        as the per-grain channels do. Any other data is pickled as it is."""
+        data, rows = self.data, None
+        try:
+            if self.valueType is float:
+                data = array('d', self.data)
+            elif self.valueType in (list, tuple) and len({len(point) for point in self.data}) <= 1:
+                data, rows = array('d', [value for point in self.data for value in point]), len(self.data)
+        except TypeError: # Non-numeric data
+            data, rows = self.data, None
+        return restoreLogChannel, (self.name, self.valueType, self.unit, data, rows)
+
     def getData(self, unit=None):
         """Return all of the data in the channel, converting it if a type is specified."""
         if unit is None: # No conversion needed
@@ -99,15 +119,32 @@ class LogChannel():
             return min([min(l) for l in self.data])
         return min(self.data)
 
+def restoreLogChannel(name, valueType, unit, data, rows):
+    """Rebuilds a log channel pickled by LogChannel.__reduce__. 'rows' is the number of datapoints that a flattened
+    list channel had, or None if the data wasn't flattened."""
+    channel = LogChannel(name, valueType, unit)
+    if not isinstance(data, array):
+        channel.data = data
+    elif rows is None:
+        channel.data = data.tolist()
+    else:
+        values = data.tolist()
+        width = len(values) // rows if rows > 0 else 0
+        channel.data = [values[row * width:(row + 1) * width] for row in range(rows)]
+    return channel
+
 singleValueChannels = ['time', 'kn', 'pressure', 'force', 'volumeLoading', 'exitPressure', 'dThroat']
 multiValueChannels = ['mass', 'massFlow', 'massFlux', 'regression', 'web', 'machNumber']
 
 class SimulationResult():
     """A SimulationResult instance contains all results from a single simulation. It has a number of LogChannels, each
     capturing a single stream of outputs from the simulation. It also includes a flag of whether the simulation was
-    considered a sucess, along with a list of alerts that the simulation produced while it was running."""
+    considered a sucess, along with a list of alerts that the simulation produced while it was running. Rather than
+    the motor itself, which would keep its grains and their maps in memory for as long as the result is kept, it holds
+    the motor's description from getDict and the initial port area of its aft grain."""
     def __init__(self, motor):
-        self.motor = motor
+        self.motorDict = motor.getDict()
+        self.aftPortArea = None # Set by the simulation once the grains are set up
 
         self.alerts = []
         self.success = False
@@ -237,16 +274,21 @@ class SimulationResult():
             return 0
         return self.getImpulse(index) / (propMass * constants.standardGravity)
 
+    def getMotor(self):
+        """Returns a new motor built from the description of the simulated one. Its grains haven't been set up for
+        simulation."""
+        from .motor import Motor # Imported here as the motor module depends on this one
+        return Motor(self.motorDict)
+
     def getPortRatio(self):
         """Returns the port/throat ratio of the motor, or None if it doesn't have a port."""
-        aftPort = self.motor.grains[-1].getPortArea(0)
-        if aftPort is not None:
-            return aftPort / geometry.circleArea(self.motor.nozzle.props['throat'].getValue())
+        if self.aftPortArea is not None:
+            return self.aftPortArea / geometry.circleArea(self.motorDict['nozzle']['throat'])
         return None
 
     def getPropellantLength(self):
         """Returns the total length of all propellant before the simulated burn."""
-        return sum([g.props['length'].getValue() for g in self.motor.grains])
+        return sum([grain['properties']['length'] for grain in self.motorDict['grains']])
 
     def getPropellantMass(self, index=0):
         """Returns the total mass of all propellant before the simulated burn. Optionally accepts a index that the mass
@@ -262,17 +304,19 @@ class SimulationResult():
         """Returns the motor's thrust coefficient for the average pressure during the burn and no throat diameter
         changes or performance losses."""
         chamberPres = self.getAveragePressure()
-        _, _, gamma, _, _ = self.motor.propellant.getCombustionProperties(chamberPres)
-        ambPressure = self.motor.config.getProperty('ambPressure')
-        return self.motor.nozzle.getIdealThrustCoeff(chamberPres, ambPressure, gamma, 0)
+        motor = self.getMotor()
+        _, _, gamma, _, _ = motor.propellant.getCombustionProperties(chamberPres)
+        ambPressure = motor.config.getProperty('ambPressure')
+        return motor.nozzle.getIdealThrustCoeff(chamberPres, ambPressure, gamma, 0)
 
     def getAdjustedThrustCoefficient(self):
         """Returns the motor's thrust coefficient for the average pressure during the burn and no throat diameter
         changes, but including performance losses."""
         chamberPres = self.getAveragePressure()
-        _, _, gamma, _, _ = self.motor.propellant.getCombustionProperties(chamberPres)
-        ambPressure = self.motor.config.getProperty('ambPressure')
-        return self.motor.nozzle.getAdjustedThrustCoeff(chamberPres, ambPressure, gamma, 0)
+        motor = self.getMotor()
+        _, _, gamma, _, _ = motor.propellant.getCombustionProperties(chamberPres)
+        ambPressure = motor.config.getProperty('ambPressure')
+        return motor.nozzle.getAdjustedThrustCoeff(chamberPres, ambPressure, gamma, 0)
 
     def getAlertsByLevel(self, level):
         """Returns all simulation alerts of the specified level."""
@@ -94,6 +94,15 @@ def run_gui(gui, configs):
     configText.config(yscrollcommand=scroll.set)
     configText.config(state='disabled')
 
+    frontLabel = tk.Label(functionsFrame, text="", justify='left')
+    frontLabel.grid(row=3, column=0, sticky='nsew', pady=(10, 0))
+
+    frontList = tk.Listbox(functionsFrame, height=8, width=40, borderwidth=1, relief='solid', exportselection=False)
+    frontList.grid(row=4, column=0, sticky='nsew')
+    frontList.grid_remove()
+
+    frontEntries = []  # (simRes, nozzleDict) for each row of frontList
+
     simGraph = None  # To hold the simulation graph label widget
 
     if FileUpload.hasConfigs(configs, 'NozzleIterator'):
@@ -117,7 +126,14 @@ def run_gui(gui, configs):
             "preference": "",
             "parallel_mode": "",
             "iteration_threads": "",
-            "exitDia": "m"
+            "exitDia": "m",
+            "top_k": "",
+            "pareto_objectives": "",
+            "result_store": "",
+            "backend": "",
+            "throat_search": "",
+            "prescreen": "",
+            "multi_fidelity": ""
         }
 
         configText.config(state='normal')
@@ -144,13 +160,67 @@ def run_gui(gui, configs):
             if stop_event.is_set():
                 return
             NIconfig = copy.deepcopy(configs)
-            simRes, nozzleDict, nozzleIteratorParams = NozzleIterator.main(NIconfig)
+            reducer = NozzleIterator.makeReducer(NIconfig['Nozzle'])
+            simRes, nozzleDict, nozzleIteratorParams = NozzleIterator.main(NIconfig, reducer, stop_event, on_progress)
             if not stop_event.is_set():
-                popup.after(0, update_gui, simRes, nozzleDict, nozzleIteratorParams)
+                popup.after(0, update_gui, simRes, nozzleDict, nozzleIteratorParams, reducer.getFront())
 
-        def update_gui(simRes, nozzleDict, nozzleIteratorParams):
+        # Called on the worker thread as sweep points finish, hands the text to the GUI thread
+        def on_progress(job):
+            if stop_event.is_set():
+                return
+            progress = job.getProgress()
+            text = f"Running... {progress['completed']}/{progress['total']} nozzles"
+            if progress['total'] > 0:
+                text += f" ({100 * progress['completed'] / progress['total']:.0f}%)"
+            if progress['eta'] is not None:
+                minutes, seconds = divmod(int(progress['eta']), 60)
+                text += f"\nTime remaining: {minutes}m {seconds:02d}s"
+            bestSim, bestNozzle = progress['best']
+            if bestSim is not None:
+                preference = job.nozzleConfig['preference']
+                text += (f"\nBest so far: {preference} {getattr(bestSim, f'get{preference}')():.2f}"
+                         f" at throat {bestNozzle['throat'] * 100:.1f} cm")
+            try:
+                popup.after(0, show_progress, text)
+            except (RuntimeError, tk.TclError):
+                pass  # window is being torn down
+
+        def show_progress(text):
+            if not stop_event.is_set() and popup.winfo_exists():
+                placeholder_canvas.itemconfig(text_id, text=text)
+
+        def update_gui(simRes, nozzleDict, nozzleIteratorParams, front):
             if not popup.winfo_exists():
                 return  # window was closed, skip GUI update
+            showFront(front, nozzleIteratorParams)
+            showResult(simRes, nozzleDict, nozzleIteratorParams)
+
+        # Lists the pareto front, selecting a row shows that nozzle in place of the preferred one
+        def showFront(front, nozzleIteratorParams):
+            frontEntries.clear()
+            frontList.delete(0, tk.END)
+            if len(front) == 0:
+                frontLabel.config(text="")
+                frontList.grid_remove()
+                return
+
+            frontLabel.config(text=f"Pareto front ({len(front)} nozzles), select to view")
+            for values, simRes, nozzleDict in front:
+                objectives = ', '.join(f"{name}: {value:.4g}" for name, value in values.items())
+                frontList.insert(tk.END, f"{nozzleDict['throat'] * 100:.1f} x {nozzleDict['throatLength'] * 100:.1f} cm  {objectives}")
+                frontEntries.append((simRes, nozzleDict))
+            frontList.grid()
+
+            def on_select(event):
+                selection = frontList.curselection()
+                if selection:
+                    simRes, nozzleDict = frontEntries[selection[0]]
+                    showResult(simRes, nozzleDict, nozzleIteratorParams)
+
+            frontList.bind('<<ListboxSelect>>', on_select)
+
+        def showResult(simRes, nozzleDict, nozzleIteratorParams):
             nonlocal simGraph
             result = SimulationUI(simRes, nozzleDict, nozzleIteratorParams)
 